@@ -0,0 +1,39 @@
+"""
+Static Assets for SharkFin
+Image sources resolved once per process: a browser-cacheable static URL when
+Streamlit serves ./static, otherwise a data URI encoded a single time
+"""
+
+import os
+import base64
+import mimetypes
+from functools import lru_cache
+import streamlit as st
+
+STATIC_DIR = 'static'
+# Where Streamlit serves STATIC_DIR when server.enableStaticServing is on
+STATIC_URL = 'app/static'
+LOGO_FILE = 'sharkfin_logo.png'
+
+@lru_cache(maxsize=None)
+def asset_src(filename):
+    """img src for a file in STATIC_DIR, or None if it doesn't exist"""
+    path = os.path.join(STATIC_DIR, filename)
+    if not os.path.exists(path):
+        return None
+    try:
+        if st.get_option('server.enableStaticServing'):
+            return f"{STATIC_URL}/{filename}"
+    except Exception:
+        pass
+    mime = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    with open(path, 'rb') as f:
+        return f"data:{mime};base64,{base64.b64encode(f.read()).decode()}"
+
+def logo_html(width, fallback):
+    """Centered logo <img>, or the fallback HTML when the logo is missing"""
+    src = asset_src(LOGO_FILE)
+    if src is None:
+        return fallback
+    return (f'<div style="text-align: center;"><img src="{src}" width="{width}" '
+            f'style="pointer-events: none;"></div>')
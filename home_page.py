@@ -3,10 +3,19 @@ Home Page - Perfect Version
 Ticker strip with colors, centered logo, compact layout
 """
 
+import time
 import streamlit as st
 from datetime import datetime
 import pytz
 import yfinance as yf
+from assets import logo_html
+from market_data import QUOTE_TTL_SECONDS
+
+# The strip reruns on its own at this interval, without rerunning the page
+TICKER_REFRESH_SECONDS = QUOTE_TTL_SECONDS
+
+# (fetched at, [(symbol, price, change %)]) shared by every session
+_ticker_cache = (0.0, [])
 
 class HomePage:
     def __init__(self):
@@ -14,7 +23,12 @@ class HomePage:
         pass
     
     def get_ticker_data(self):
-        """Get real-time ticker data for major stocks"""
+        """Get real-time ticker data for major stocks, reused for TICKER_REFRESH_SECONDS"""
+        global _ticker_cache
+        fetched_at, data = _ticker_cache
+        if data and time.time() - fetched_at < TICKER_REFRESH_SECONDS:
+            return data
+        
         symbols = ["SPY", "QQQ", "DIA", "AAPL", "MSFT", "NVDA", "TSLA", 
            "GOOGL", "AMZN", "JPM", "XOM", "BTC-USD"]
         data = []
@@ -30,12 +44,13 @@ class HomePage:
                 # Fallback if API fails
                 pass
         
+        if data:
+            _ticker_cache = (time.time(), data)
         return data
     
-    def create_content(self):
-        """Display home page with ticker strip and quick access"""
-        
-        # ===== TICKER STRIP AT TOP =====
+    @st.fragment(run_every=TICKER_REFRESH_SECONDS)
+    def ticker_strip(self):
+        """Scrolling quote strip, refreshed in its own fragment"""
         ticker_data = self.get_ticker_data()
         
         # Build ticker HTML with proper colors
@@ -68,21 +83,22 @@ class HomePage:
             </marquee>
         </div>
         """, unsafe_allow_html=True)
-
-
+    
+    def create_content(self):
+        """Display home page with ticker strip and quick access"""
+        
+        # ===== TICKER STRIP AT TOP =====
+        self.ticker_strip()
         
         # ===== CENTERED LOGO SECTION =====
         col_left, col_center, col_right = st.columns([1.5, 1, 1.5])
         
         with col_center:
             # SharkFin Logo - centered
-            try:
-                st.image("sharkfin_logo.png", width=280)
-            except:
-                st.markdown(
-                    "<h1 style='text-align: center; font-size: 48px; margin: 0;'>🦈 SharkFin</h1>",
-                    unsafe_allow_html=True
-                )
+            st.markdown(
+                logo_html(280, "<h1 style='text-align: center; font-size: 48px; margin: 0;'>🦈 SharkFin</h1>"),
+                unsafe_allow_html=True
+            )
             
             # Tagline
             st.markdown(
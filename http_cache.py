@@ -0,0 +1,142 @@
+"""
+HTTP Cache for SharkFin
+Conditional GETs with persisted validators and bodies, plus memoized parse results,
+both bounded to the most recently used URLs
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import requests
+
+HTTP_CACHE_DIR = 'http_cache'
+HTTP_TIMEOUT_SECONDS = 15
+# Search feeds make the URL space open-ended: keep this many cached documents
+# (least recently used dropped) on disk and as parse results in memory
+HTTP_CACHE_MAX_ENTRIES = 256
+# How often the on-disk cache is swept down to HTTP_CACHE_MAX_ENTRIES
+HTTP_CACHE_PRUNE_SECONDS = 600
+# Some feeds reject the default python-requests agent
+HTTP_USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+
+_session = requests.Session()
+_session.headers['User-Agent'] = HTTP_USER_AGENT
+
+# url -> (digest, parsed result), least recently used first
+_parsed = OrderedDict()
+_parsed_lock = threading.Lock()
+
+_prune_state = {'last': 0.0}
+_prune_lock = threading.Lock()
+
+def _cache_paths(url):
+    key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    base = os.path.join(HTTP_CACHE_DIR, key)
+    return base + '.json', base + '.body'
+
+def _load_entry(url):
+    """(validators dict, body bytes) for a cached URL, or (None, None)"""
+    meta_path, body_path = _cache_paths(url)
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        with open(body_path, 'rb') as f:
+            return meta, f.read()
+    except (OSError, ValueError):
+        return None, None
+
+def _save_entry(url, meta, body):
+    os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+    meta_path, body_path = _cache_paths(url)
+    # Write body first so a meta file never points at a missing body
+    for path, mode, data in ((body_path, 'wb', body), (meta_path, 'w', json.dumps(meta))):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, mode) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+def _touch_entry(url):
+    """Mark a cached URL as recently used, for pruning"""
+    try:
+        os.utime(_cache_paths(url)[0])
+    except OSError:
+        pass
+
+def _prune_disk():
+    """Delete all but the HTTP_CACHE_MAX_ENTRIES most recently used cached documents"""
+    now = time.time()
+    with _prune_lock:
+        if now - _prune_state['last'] < HTTP_CACHE_PRUNE_SECONDS:
+            return
+        _prune_state['last'] = now
+    try:
+        metas = [e for e in os.scandir(HTTP_CACHE_DIR) if e.name.endswith('.json')]
+        metas.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    except OSError:
+        return
+    for entry in metas[HTTP_CACHE_MAX_ENTRIES:]:
+        base = entry.path[:-len('.json')]
+        for path in (entry.path, base + '.body'):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def conditional_get(url, timeout=HTTP_TIMEOUT_SECONDS):
+    """Body of url and its content digest, revalidating any cached copy.
+
+    Sends If-None-Match / If-Modified-Since when validators are stored and
+    reuses the cached body on 304. If the request fails, the cached body is
+    returned when there is one; otherwise the error propagates.
+    """
+    meta, body = _load_entry(url)
+    headers = {}
+    if meta:
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    try:
+        response = _session.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and body is not None:
+            _touch_entry(url)
+            return body, meta['digest']
+        response.raise_for_status()
+    except requests.RequestException as e:
+        if body is None:
+            raise
+        print(f"⚠️ Using cached copy of {url}: {e}")
+        return body, meta['digest']
+
+    body = response.content
+    meta = {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'digest': hashlib.sha1(body).hexdigest(),
+    }
+    try:
+        _save_entry(url, meta, body)
+    except OSError as e:
+        print(f"⚠️ Could not cache {url}: {e}")
+    _prune_disk()
+    return body, meta['digest']
+
+def fetch_parsed(url, parse):
+    """parse(body) for url, re-parsed only when the document actually changed"""
+    body, digest = conditional_get(url)
+    with _parsed_lock:
+        cached = _parsed.get(url)
+        if cached and cached[0] == digest:
+            _parsed.move_to_end(url)
+            return cached[1]
+    result = parse(body)
+    with _parsed_lock:
+        _parsed[url] = (digest, result)
+        _parsed.move_to_end(url)
+        while len(_parsed) > HTTP_CACHE_MAX_ENTRIES:
+            _parsed.popitem(last=False)
+    return result
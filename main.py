@@ -3,10 +3,12 @@ SharkFin - Financial Intelligence Platform
 Main application entry point
 """
 
+import startup
 import streamlit as st
-import json
 from datetime import datetime
 import pytz
+from storage import get_portfolio_service, normalize_user, DEFAULT_USER
+from assets import logo_html
 
 # Configure page
 st.set_page_config(
@@ -18,12 +20,15 @@ st.set_page_config(
 with st.sidebar:
     st.markdown("## 📂 Menu")
 
-# Import pages
-from home_page import HomePage
-from portfolio_page import PortfolioPage
-from research_page import ResearchPage
-from prediction_page import PredictionPage
-from top_performers_page import TopPerformersPage
+# Pages are imported on first visit, so a cold start only pays for the page being shown
+PAGES = {
+    "Home": ("home_page", "HomePage"),
+    "Portfolio": ("portfolio_page", "PortfolioPage"),
+    "Research": ("research_page", "ResearchPage"),
+    "Predictions": ("prediction_page", "PredictionPage"),
+    "Top Performers": ("top_performers_page", "TopPerformersPage"),
+    "Screener": ("screener_page", "ScreenerPage"),
+}
 
 # Custom CSS
 st.markdown("""
@@ -199,59 +204,70 @@ if 'portfolio' not in st.session_state:
     st.session_state.portfolio = []
 if 'watchlist' not in st.session_state:
     st.session_state.watchlist = []
-if 'news_cache' not in st.session_state:
-    st.session_state.news_cache = {}
 if 'current_page' not in st.session_state:
     st.session_state.current_page = "Home"
+if 'user_id' not in st.session_state:
+    st.session_state.user_id = DEFAULT_USER
+
+# Data functions - reads are served from the service's per-user cache,
+# writes go straight to the ledger
+portfolio_service = get_portfolio_service()
+
+def current_user():
+    return normalize_user(st.session_state.user_id)
 
-# Data functions
 def load_data():
+    user_id = current_user()
+    st.session_state.portfolio = portfolio_service.get_portfolio(user_id)
+    st.session_state.watchlist = portfolio_service.get_watchlist(user_id)
+
+def add_position(symbol, shares, buy_price, buy_date=None):
     try:
-        with open('portfolio.json', 'r') as f:
-            data = json.load(f)
-            st.session_state.portfolio = data if isinstance(data, list) else []
-    except:
-        st.session_state.portfolio = []
-    
+        portfolio_service.add_position(current_user(), symbol, shares, buy_price, buy_date)
+    except Exception as e:
+        st.error(f"Error saving data: {e}")
+    load_data()
+
+def remove_position(lot_id):
+    try:
+        portfolio_service.remove_position(current_user(), lot_id)
+    except Exception as e:
+        st.error(f"Error saving data: {e}")
+    load_data()
+
+def add_to_watchlist(symbol):
     try:
-        with open('watchlist.json', 'r') as f:
-            data = json.load(f)
-            st.session_state.watchlist = data if isinstance(data, list) else []
-    except:
-        st.session_state.watchlist = []
+        portfolio_service.add_to_watchlist(current_user(), symbol)
+    except Exception as e:
+        st.error(f"Error saving data: {e}")
+    load_data()
 
-def save_data():
+def remove_from_watchlist(symbol):
     try:
-        with open('portfolio.json', 'w') as f:
-            json.dump(st.session_state.portfolio, f, indent=2)
-        with open('watchlist.json', 'w') as f:
-            json.dump(st.session_state.watchlist, f, indent=2)
+        portfolio_service.remove_from_watchlist(current_user(), symbol)
     except Exception as e:
         st.error(f"Error saving data: {e}")
+    load_data()
 
 load_data()
-st.session_state.save_data = save_data
+st.session_state.add_position = add_position
+st.session_state.remove_position = remove_position
+st.session_state.add_to_watchlist = add_to_watchlist
+st.session_state.remove_from_watchlist = remove_from_watchlist
 # SIDEBAR with visible current page
 with st.sidebar:
     st.markdown("<br>", unsafe_allow_html=True)
-    try:
-        from pathlib import Path
-        logo_path = Path("sharkfin_logo.png")
-        if logo_path.exists():
-            import base64
-            with open(logo_path, "rb") as f:
-                logo_data = base64.b64encode(f.read()).decode()
-            st.markdown(
-                f'<div style="text-align: center;"><img src="data:image/png;base64,{logo_data}" width="160" style="pointer-events: none;"></div>',
-                unsafe_allow_html=True
-            )
-        else:
-            st.markdown("<h2 style='text-align: center;'>🦈 SharkFin</h2>", unsafe_allow_html=True)
-    except:
-        st.markdown("<h2 style='text-align: center;'>🦈 SharkFin</h2>", unsafe_allow_html=True)
+    st.markdown(
+        logo_html(160, "<h2 style='text-align: center;'>🦈 SharkFin</h2>"),
+        unsafe_allow_html=True
+    )
     st.markdown("<br>", unsafe_allow_html=True)
     st.markdown("---")
     
+    # Portfolios and watchlists are kept per user
+    st.text_input("👤 User", key="user_id", help="Each user has their own portfolio and watchlist")
+    st.markdown("---")
+
     # Show current page
     st.markdown(f"**Current Page:** {st.session_state.current_page}")
     st.markdown("---")
@@ -263,7 +279,8 @@ with st.sidebar:
         ("💼  Portfolio", "Portfolio"),
         ("🔍  Research", "Research"),
         ("🔮  Predictions", "Predictions"),
-        ("🏆  Top Performers", "Top Performers")
+        ("🏆  Top Performers", "Top Performers"),
+        ("🧮  Screener", "Screener")
     ]
     
     for label, page_name in pages:
@@ -275,23 +292,16 @@ with st.sidebar:
             st.rerun()
         
         st.markdown("<br>", unsafe_allow_html=True)
+    
+    with st.expander("⏱️ Startup times"):
+        for line in startup.startup_report() or ["Measured after the first page renders"]:
+            st.caption(line)
 
 # Route to page
-if st.session_state.current_page == "Home":
-    home = HomePage()
-    home.create_content()
-elif st.session_state.current_page == "Portfolio":
-    portfolio = PortfolioPage()
-    portfolio.create_content()
-elif st.session_state.current_page == "Research":
-    research = ResearchPage()
-    research.create_content()
-elif st.session_state.current_page == "Predictions":
-    prediction = PredictionPage()
-    prediction.create_content()
-elif st.session_state.current_page == "Top Performers":
-    top_performers = TopPerformersPage()
-    top_performers.create_content()
+if st.session_state.current_page in PAGES:
+    page_class = startup.load_page(*PAGES[st.session_state.current_page])
+    page_class().create_content()
+    startup.mark_rendered(st.session_state.current_page)
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,149 @@
+"""
+Market Data for SharkFin
+Batched price lookups and a shared, incrementally updated price-history cache
+"""
+
+import os
+import time
+import threading
+import pandas as pd
+import yfinance as yf
+
+QUOTE_TTL_SECONDS = 60
+
+HISTORY_DIR = 'price_cache'
+HISTORY_FILE = os.path.join(HISTORY_DIR, 'price_history.pkl')
+# How often a symbol's latest bars are re-checked
+HISTORY_REFRESH_MINUTES = 15
+# Re-download a few recent days so a still-forming last bar gets corrected
+HISTORY_OVERLAP_DAYS = 5
+
+_quote_cache = {}
+_quote_lock = threading.Lock()
+
+_history = {}
+_history_lock = threading.Lock()
+
+# ============================================================================
+# BATCHED QUOTES
+# ============================================================================
+
+def _download_closes(symbols, **kwargs):
+    """Close prices for several symbols in one request, one column per symbol"""
+    data = yf.download(symbols, progress=False, auto_adjust=True, threads=True, **kwargs)
+    if data is None or data.empty:
+        return pd.DataFrame(columns=symbols)
+    closes = data['Close']
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(symbols[0])
+    return closes
+
+def get_latest_prices(symbols):
+    """Latest price per symbol from a single batched download.
+
+    Returns a Series indexed by symbol (NaN where Yahoo had nothing).
+    Results are shared across reruns and sessions for QUOTE_TTL_SECONDS.
+    """
+    symbols = sorted(set(symbols))
+    if not symbols:
+        return pd.Series(dtype='float64')
+
+    key = tuple(symbols)
+    with _quote_lock:
+        cached = _quote_cache.get(key)
+        if cached and time.time() - cached[0] < QUOTE_TTL_SECONDS:
+            return cached[1]
+
+    try:
+        closes = _download_closes(symbols, period='5d', interval='1d')
+        prices = closes.ffill().iloc[-1].reindex(symbols).astype('float64')
+    except Exception as e:
+        print(f"⚠️ Batch quote failed: {e}")
+        prices = pd.Series(float('nan'), index=symbols)
+
+    with _quote_lock:
+        _quote_cache[key] = (time.time(), prices)
+    return prices
+
+# ============================================================================
+# PRICE HISTORY CACHE
+# ============================================================================
+
+def _load_history():
+    """Process-wide history state, read from disk on first use"""
+    if not _history:
+        try:
+            _history.update(pd.read_pickle(HISTORY_FILE))
+        except Exception:
+            _history.update({'closes': pd.DataFrame(), 'starts': {}, 'refreshed': {}})
+    return _history
+
+def _save_history(state):
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    pd.to_pickle(dict(state), HISTORY_FILE)
+
+def get_price_history(symbols, start):
+    """Aligned daily close matrix (dates x symbols) from `start` onward.
+
+    Backed by one cache shared by every session and persisted to disk.
+    Symbols seen for the first time are downloaded once in a single batch;
+    after that only the last few bars are fetched, at most every
+    HISTORY_REFRESH_MINUTES.
+    """
+    symbols = sorted(set(symbols))
+    start = pd.Timestamp(start).normalize()
+    if not symbols:
+        return pd.DataFrame()
+
+    with _history_lock:
+        state = _load_history()
+        closes, starts, refreshed = state['closes'], state['starts'], state['refreshed']
+        failed = state.setdefault('failed', {})
+        now = time.time()
+        changed = False
+        refresh_seconds = HISTORY_REFRESH_MINUTES * 60
+
+        # New symbols, or an earlier start than we have: full download.
+        # Symbols that returned nothing are retried, but not on every call
+        missing = [s for s in symbols if (s not in starts or starts[s] > start)
+                   and now - failed.get(s, 0) > refresh_seconds]
+        if missing:
+            try:
+                fresh = _download_closes(missing, start=start.strftime('%Y-%m-%d'))
+                closes = fresh.combine_first(closes)
+            except Exception as e:
+                print(f"⚠️ History download failed: {e}")
+                fresh = pd.DataFrame()
+            # Only symbols that came back count as loaded
+            for s in missing:
+                if s in fresh and fresh[s].notna().any():
+                    starts[s] = start
+                    refreshed[s] = now
+                    failed.pop(s, None)
+                else:
+                    failed[s] = now
+            changed = True
+
+        # Known symbols: append only the latest bars
+        stale = [s for s in symbols if s in starts and now - refreshed.get(s, 0) > refresh_seconds]
+        if stale:
+            last_dates = [closes[s].last_valid_index() if s in closes else None for s in stale]
+            last_dates = [d for d in last_dates if d is not None]
+            since = min(last_dates) if last_dates else start
+            since -= pd.Timedelta(days=HISTORY_OVERLAP_DAYS)
+            try:
+                tail = _download_closes(stale, start=since.strftime('%Y-%m-%d'))
+                closes = tail.combine_first(closes)
+                for s in stale:
+                    refreshed[s] = now
+                changed = True
+            except Exception as e:
+                print(f"⚠️ History refresh failed: {e}")
+
+        if changed:
+            state['closes'] = closes.sort_index()
+            _save_history(state)
+
+        closes = state['closes']
+
+    return closes.loc[closes.index >= start].reindex(columns=symbols)
@@ -0,0 +1,276 @@
+"""
+News Index for SharkFin
+In-memory inverted index with BM25 ranking over every article the feeds have returned,
+plus ticker/company tagging for per-symbol news
+"""
+
+import re
+import math
+import time
+import threading
+from collections import Counter
+
+NEWS_INDEX_TTL_HOURS = 24
+NEWS_INDEX_MAX_ARTICLES = 5000
+# How often expired articles are swept out
+NEWS_INDEX_PURGE_SECONDS = 60
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_TAG_RE = re.compile(r'<[^>]+>')
+STOP_WORDS = frozenset("""
+    a an and are as at be by for from has have in is it its of on or that the to was
+    were will with this these those after over into about than more new says stock stocks
+""".split())
+
+# Uppercase words that look like tickers but almost never mean one in a headline
+COMMON_ACRONYMS = frozenset("""
+    CEO CFO CTO COO IPO ETF GDP CPI PPI SEC FDA FTC DOJ IRS USA EPS ESG API FED ECB IMF
+    NYSE NASDAQ AMEX LLC INC PLC USD EUR GBP JPY NFT EVS AI EV US UK EU
+""".split())
+# Ordinary English words that are also tickers (ALL, NOW, KEY, LOW, ...); typed in
+# capitals for emphasis far more often than as a bare ticker. $ALL / (NOW) still tag
+COMMON_WORDS = frozenset("""
+    ALL AND ANY ARE BEST BIG BILL BLUE BOX CAN CAR CARE CASH COLD COOL DAY DEAL DOG EAT
+    EDGE EVER EYE FAN FARM FAST FIT FLOW FLY FOR FREE FUN FUND GAIN GLAD GOLD GOOD GROW
+    HAS HEAR HIGH HOME HOPE HOT HUGE INFO JOB JOBS KEY LAND LEAD LESS LIFE LINK LIVE
+    LOAN LOOK LOVE LOW MAIN MAN MIND MORE MOST MOVE NEAR NEW NEXT NICE NOT NOW ONCE ONE
+    OPEN OUT OWN PAY PEAK PLAN PLAY POST PURE RARE RATE REAL RIDE RISE ROCK RUN SAFE
+    SAVE SEE SELL SHE SHIP SHOP SIGN SITE SIX SKY SPOT STAR STEP SURE TALK TECH TELL TEN
+    THE TIME TOP TOUR TRIP TRUE TURN TWO UNIT USE VERY VIEW WAIT WALL WANT WAVE WEEK
+    WELL WIN WORK WOW YEAR YOU ZONE
+""".split())
+# Dropped from company names before matching ("Apple Inc." -> "apple")
+NAME_SUFFIXES = frozenset("""
+    inc incorporated corp corporation co company ltd limited plc llc lp sa nv ag se
+    holdings holding group class the
+""".split())
+
+_EXPLICIT_TICKER_RE = re.compile(
+    r'\$([A-Z]{1,5}(?:[.-][A-Z])?)\b'
+    r'|\(([A-Z]{1,5}(?:[.-][A-Z])?)\)'
+    r'|\b(?:NASDAQ|NYSE|AMEX|NYSEARCA)\s*:\s*([A-Z]{1,5}(?:[.-][A-Z])?)\b'
+)
+_BARE_TICKER_RE = re.compile(r'\b[A-Z]{3,5}\b')
+_WORD_RE = re.compile(r"[A-Za-z0-9&']+")
+
+def company_name_tokens(name):
+    """Match tokens for a company name, or () if too generic to match safely"""
+    tokens = [t for t in _WORD_RE.findall(name.lower().replace("'s", '')) if t not in NAME_SUFFIXES]
+    # Trailing share-class letters ("Class A") and lone initials add nothing
+    while tokens and len(tokens[-1]) == 1:
+        tokens.pop()
+    if not tokens or (len(tokens) == 1 and len(tokens[0]) < 4):
+        return ()
+    return tuple(tokens)
+
+class EntityTagger:
+    """Finds universe tickers and company names mentioned in article text.
+
+    Tickers are taken from explicit forms ($AAPL, (AAPL), NASDAQ: AAPL) and
+    bare 3-5 letter uppercase words in the universe that aren't common
+    acronyms or everyday words. Company names are
+    matched in one left-to-right pass over the words with a token trie.
+    A single-word name ("Target", "Visa") is also an ordinary word, so it
+    only counts when capitalized next to a lowercase word, as in running
+    text; inside a Title Case headline it needs an explicit ticker.
+    """
+
+    def __init__(self, symbols, names):
+        self.symbols = frozenset(symbols)
+        self._trie = {}
+        for symbol, name in names.items():
+            tokens = company_name_tokens(name or '')
+            if not tokens:
+                continue
+            node = self._trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node.setdefault(None, set()).add(symbol)
+
+    def _ticker(self, raw):
+        symbol = raw.replace('.', '-')
+        return symbol if symbol in self.symbols else None
+
+    def tag(self, text):
+        """Set of symbols mentioned in text"""
+        found = set()
+        for match in _EXPLICIT_TICKER_RE.finditer(text):
+            symbol = self._ticker(next(g for g in match.groups() if g))
+            if symbol:
+                found.add(symbol)
+        for word in _BARE_TICKER_RE.findall(text):
+            if word not in COMMON_ACRONYMS and word not in COMMON_WORDS and word in self.symbols:
+                found.add(word)
+
+        words = _WORD_RE.findall(text.replace("'s", ''))
+        lowered = [w.lower() for w in words]
+        for start in range(len(words)):
+            node = self._trie.get(lowered[start])
+            end = start + 1
+            while node is not None:
+                symbols = node.get(None)
+                if symbols and (end - start > 1 or _capitalized_in_text(words, start)):
+                    found |= symbols
+                node = node.get(lowered[end]) if end < len(words) else None
+                end += 1
+        return found
+
+def _capitalized_in_text(words, i):
+    """words[i] is capitalized where the words around it are not (not Title Case)"""
+    if not words[i][0].isupper():
+        return False
+    neighbours = words[max(i - 1, 0):i] + words[i + 1:i + 2]
+    return any(w[0].islower() for w in neighbours)
+
+def tokenize(text):
+    """Lowercase search terms from text, without HTML tags or stop words"""
+    return [t for t in _TOKEN_RE.findall(_TAG_RE.sub(' ', text).lower())
+            if len(t) > 1 and t not in STOP_WORDS]
+
+class NewsIndex:
+    """Inverted index of recently seen articles, shared by every session.
+
+    Articles are keyed by title, so a story seen again just has its expiry
+    pushed back. Entries expire NEWS_INDEX_TTL_HOURS after they were last
+    seen and the oldest are evicted past NEWS_INDEX_MAX_ARTICLES. With a
+    tagger set, each article is tagged once on insert and a symbol ->
+    articles map is kept alongside the term postings.
+    """
+
+    def __init__(self, ttl_hours=NEWS_INDEX_TTL_HOURS, max_articles=NEWS_INDEX_MAX_ARTICLES):
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_articles = max_articles
+        self._docs = {}        # doc id -> (article, term counts, length, last seen, symbols)
+        self._ids = {}         # title key -> doc id
+        self._postings = {}    # term -> {doc id: term frequency}
+        self._by_symbol = {}   # symbol -> {doc ids}
+        self.tagger = None
+        self._total_length = 0
+        self._next_id = 0
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _remove(self, doc_id):
+        article, terms, length, _, symbols = self._docs.pop(doc_id)
+        self._ids.pop(article['title'].strip().lower(), None)
+        self._total_length -= length
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        self._unlink_symbols(doc_id, symbols)
+
+    def _tag(self, article):
+        if self.tagger is None:
+            return frozenset()
+        return frozenset(self.tagger.tag(f"{article['title']} {_TAG_RE.sub(' ', article.get('description', ''))}"))
+
+    def _link_symbols(self, doc_id, symbols):
+        for symbol in symbols:
+            self._by_symbol.setdefault(symbol, set()).add(doc_id)
+
+    def _unlink_symbols(self, doc_id, symbols):
+        for symbol in symbols:
+            linked = self._by_symbol[symbol]
+            linked.discard(doc_id)
+            if not linked:
+                del self._by_symbol[symbol]
+
+    def set_tagger(self, tagger):
+        """Install a new entity tagger and retag everything already indexed"""
+        with self._lock:
+            self.tagger = tagger
+            self._by_symbol = {}
+            for doc_id, doc in self._docs.items():
+                symbols = self._tag(doc[0])
+                self._docs[doc_id] = doc[:4] + (symbols,)
+                self._link_symbols(doc_id, symbols)
+
+    def _purge(self, now):
+        if now - self._last_purge < NEWS_INDEX_PURGE_SECONDS:
+            return
+        self._last_purge = now
+        for doc_id in [d for d, doc in self._docs.items() if now - doc[3] > self.ttl_seconds]:
+            self._remove(doc_id)
+
+    def add(self, articles):
+        """Index articles (dicts with title/description)"""
+        now = time.time()
+        with self._lock:
+            for article in articles:
+                key = article.get('title', '').strip().lower()
+                if not key:
+                    continue
+                doc_id = self._ids.get(key)
+                if doc_id is not None:
+                    doc = self._docs[doc_id]
+                    self._docs[doc_id] = doc[:3] + (now, doc[4])
+                    continue
+
+                terms = Counter(tokenize(f"{article['title']} {article.get('description', '')}"))
+                length = sum(terms.values())
+                symbols = self._tag(article)
+                doc_id = self._next_id
+                self._next_id += 1
+                self._docs[doc_id] = (article, terms, length, now, symbols)
+                self._ids[key] = doc_id
+                self._link_symbols(doc_id, symbols)
+                self._total_length += length
+                for term, tf in terms.items():
+                    self._postings.setdefault(term, {})[doc_id] = tf
+
+            # Doc ids grow with insertion, so the smallest are the oldest
+            while len(self._docs) > self.max_articles:
+                self._remove(min(self._docs))
+            self._purge(now)
+
+    def search(self, query, limit=20, require_all=False):
+        """Best BM25 matches for a keyword query, as article copies with relevance_score.
+
+        BM25 ranks any article sharing one query term; require_all keeps only
+        articles that contain every term.
+        """
+        terms = set(tokenize(query))
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            if not terms or not self._docs:
+                return []
+
+            n_docs = len(self._docs)
+            avg_length = self._total_length / n_docs or 1
+            scores = Counter()
+            matched = Counter()
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    article, _, length, seen, _ = self._docs[doc_id]
+                    if now - seen > self.ttl_seconds:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                    scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+                    matched[doc_id] += 1
+
+            if require_all:
+                scores = Counter({d: score for d, score in scores.items() if matched[d] == len(terms)})
+            return [dict(self._docs[doc_id][0], relevance_score=score)
+                    for doc_id, score in scores.most_common(limit)]
+
+    def articles_for(self, symbol, limit=10):
+        """Most recently indexed articles mentioning symbol"""
+        now = time.time()
+        with self._lock:
+            doc_ids = sorted(self._by_symbol.get(symbol, ()), reverse=True)
+            return [self._docs[d][0] for d in doc_ids if now - self._docs[d][3] <= self.ttl_seconds][:limit]
+
+article_index = NewsIndex()
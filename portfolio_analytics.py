@@ -0,0 +1,307 @@
+"""
+Portfolio Analytics for SharkFin
+Vectorized valuation and performance over a compact holdings table
+"""
+
+import threading
+from datetime import datetime, timedelta
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from market_data import get_latest_prices, get_price_history
+from utils import sparkline_svgs
+
+BENCHMARK = 'SPY'
+# History window for lots saved before buy dates were recorded
+UNDATED_LOOKBACK_DAYS = 365
+
+# Trailing windows in trading days
+PERIODS = {'1M': 21, '3M': 63, '6M': 126, '1Y': 252}
+
+TRADING_DAYS = 252
+RISK_LOOKBACK_DAYS = 365
+VAR_CONFIDENCE = 0.95
+# Fewest daily returns a holding needs to enter the risk figures, and the
+# fewest shared days before historical VaR/CVaR is reported
+RISK_MIN_HISTORY_DAYS = 60
+
+# (symbols, last bar date) -> return statistics, shared across sessions
+_risk_cache = {}
+_risk_lock = threading.Lock()
+
+SPARKLINE_DAYS = 90
+# (symbols, last bar date) -> sparkline data URIs, shared across sessions
+_sparkline_cache = {}
+_sparkline_lock = threading.Lock()
+
+# ============================================================================
+# VALUATION
+# ============================================================================
+
+def holdings_table(portfolio):
+    """One row per lot with typed columns (and its ledger id), built from the persisted position dicts"""
+    lots = pd.DataFrame(portfolio, columns=['id', 'symbol', 'shares', 'buy_price', 'buy_date'])
+    lots['shares'] = lots['shares'].astype('float64')
+    lots['buy_price'] = lots['buy_price'].astype('float64')
+    lots['buy_date'] = pd.to_datetime(lots['buy_date'], errors='coerce')
+    return lots
+
+def value_portfolio(portfolio):
+    """Value every lot with one batched price lookup for the distinct symbols.
+
+    Lots without a quote fall back to their buy price. The persisted dicts
+    are left untouched; computed fields live only in the returned table.
+    """
+    lots = holdings_table(portfolio)
+    prices = get_latest_prices(lots['symbol'].unique())
+
+    current = lots['symbol'].map(prices).to_numpy(dtype='float64')
+    buy_price = lots['buy_price'].to_numpy()
+    shares = lots['shares'].to_numpy()
+
+    lots['current_price'] = np.where(np.isnan(current), buy_price, current)
+    lots['value'] = lots['current_price'].to_numpy() * shares
+    lots['cost'] = buy_price * shares
+    lots['gain'] = lots['value'] - lots['cost']
+    cost = lots['cost'].to_numpy()
+    lots['gain_pct'] = np.divide(lots['gain'].to_numpy() * 100, cost,
+                                 out=np.zeros(len(lots)), where=cost > 0)
+    return lots
+
+def holding_sparklines(symbols):
+    """Sparkline per symbol from one slice of the shared close matrix.
+
+    Rebuilt only when a new trading day appears in the history.
+    """
+    symbols = sorted(set(symbols))
+    if not symbols:
+        return {}
+    closes = get_price_history(symbols, datetime.now() - timedelta(days=SPARKLINE_DAYS)).dropna(how='all')
+    if closes.empty:
+        return {}
+
+    key = (tuple(symbols), closes.index[-1])
+    with _sparkline_lock:
+        if key in _sparkline_cache:
+            return _sparkline_cache[key]
+
+    sparks = sparkline_svgs(closes)
+    with _sparkline_lock:
+        # Only the latest day per symbol set is worth keeping
+        for old in [k for k in _sparkline_cache if k[0] == key[0]]:
+            del _sparkline_cache[old]
+        _sparkline_cache[key] = sparks
+    return sparks
+
+# ============================================================================
+# PERFORMANCE
+# ============================================================================
+
+def equity_curve(portfolio, benchmark=BENCHMARK):
+    """Daily equity curve from lot buy dates over an aligned close matrix.
+
+    Returns a DataFrame indexed by date with:
+      value     - market value of the lots held that day
+      invested  - cumulative cost of lots bought so far
+      index     - time-weighted return index (starts at 100), so buying
+                  more shares doesn't register as performance
+      drawdown  - fraction below the running peak of `index`
+      benchmark - benchmark rebased to 100 on the same start date
+    Lots without a buy date are treated as held for the last year; days
+    without a price for a lot value it at its buy price.
+    """
+    lots = holdings_table(portfolio)
+    if lots.empty:
+        return pd.DataFrame()
+
+    default_start = pd.Timestamp(datetime.now() - timedelta(days=UNDATED_LOOKBACK_DAYS)).normalize()
+    buy_dates = lots['buy_date'].fillna(default_start)
+    start = buy_dates.min()
+
+    closes = get_price_history(list(lots['symbol']) + [benchmark], start).ffill()
+    closes = closes.dropna(how='all')
+    if closes.empty:
+        return pd.DataFrame()
+    dates = closes.index
+
+    # Held-shares matrix (dates x lots): a lot counts from its first trading day on
+    buy_idx = dates.searchsorted(buy_dates.to_numpy())
+    held = np.arange(len(dates))[:, None] >= buy_idx[None, :]
+    shares = lots['shares'].to_numpy()
+    # Lots with no price yet (bad symbol, empty download) are carried at cost,
+    # as in value_portfolio, so their buy flow isn't booked as a total loss
+    prices = closes[lots['symbol']].to_numpy()
+    prices = np.where(np.isnan(prices), lots['buy_price'].to_numpy()[None, :], prices)
+
+    lot_values = np.where(held, prices * shares, 0.0)
+    value = lot_values.sum(axis=1)
+
+    # Cash flows on each buy date, for time-weighted returns
+    lot_costs = shares * lots['buy_price'].to_numpy()
+    flows = np.zeros(len(dates))
+    bought = buy_idx < len(dates)
+    np.add.at(flows, buy_idx[bought], lot_costs[bought])
+
+    prev_value = np.concatenate(([0.0], value[:-1]))
+    daily_return = np.divide(value - flows, prev_value, out=np.ones(len(dates)), where=prev_value > 0) - 1
+    index = 100 * np.cumprod(1 + daily_return)
+
+    curve = pd.DataFrame({
+        'value': value,
+        'invested': np.cumsum(flows),
+        'index': index,
+        'benchmark': closes[benchmark].to_numpy(),
+    }, index=dates)
+
+    # Start from the first day anything was held, benchmark rebased to match
+    curve = curve[curve['value'] > 0].copy()
+    bench = curve['benchmark'].dropna()
+    curve['benchmark'] = 100 * curve['benchmark'] / bench.iloc[0] if not bench.empty else np.nan
+    curve['drawdown'] = curve['index'] / curve['index'].cummax() - 1
+    return curve
+
+def period_returns(series):
+    """Trailing returns (fractions) of an index series for PERIODS plus YTD and All"""
+    series = series.dropna()
+    returns = {}
+    if series.empty:
+        return returns
+    last = series.iloc[-1]
+    for label, days in PERIODS.items():
+        if len(series) > days:
+            returns[label] = last / series.iloc[-days - 1] - 1
+    year_start = series[series.index < pd.Timestamp(series.index[-1].year, 1, 1)]
+    if not year_start.empty:
+        returns['YTD'] = last / year_start.iloc[-1] - 1
+    returns['All'] = last / series.iloc[0] - 1
+    return returns
+
+# ============================================================================
+# RISK
+# ============================================================================
+
+def _nearest_psd(cov):
+    """Covariance with negative eigenvalues clipped, so portfolio variance can't go negative"""
+    values, vectors = np.linalg.eigh(cov)
+    if values.min() >= 0:
+        return cov
+    return (vectors * values.clip(min=0)) @ vectors.T
+
+def return_statistics(symbols, benchmark=BENCHMARK):
+    """Daily returns, covariance and betas for a set of symbols.
+
+    Covariances are pairwise-complete over the whole lookback, so a recent
+    listing doesn't shorten everyone else's window. Symbols with fewer than
+    RISK_MIN_HISTORY_DAYS returns are left out and reported in `short`.
+    `returns` holds only the days every included symbol traded, for
+    historical VaR. Computed once per trading day per symbol set and
+    shared by every session holding the same symbols.
+    """
+    symbols = sorted(set(symbols))
+    start = pd.Timestamp(datetime.now() - timedelta(days=RISK_LOOKBACK_DAYS)).normalize()
+    closes = get_price_history(symbols + [benchmark], start).ffill()
+    returns = closes.pct_change().iloc[1:].dropna(how='all')
+
+    key = (tuple(symbols), returns.index[-1] if len(returns) else None)
+    with _risk_lock:
+        cached = _risk_cache.get(key)
+    if cached:
+        return cached
+
+    counts = returns.reindex(columns=symbols).count()
+    included = [s for s in symbols if counts[s] >= RISK_MIN_HISTORY_DAYS]
+    short = [s for s in symbols if counts[s] < RISK_MIN_HISTORY_DAYS]
+
+    full_cov = returns[included + [benchmark]].cov(min_periods=RISK_MIN_HISTORY_DAYS).fillna(0.0).to_numpy()
+    cov = _nearest_psd(full_cov[:-1, :-1])
+    market_var = full_cov[-1, -1]
+    std = np.sqrt(np.diag(cov))
+    common = returns[included].dropna()
+
+    stats = {
+        'symbols': included,
+        'short': short,
+        'dates': returns.index,
+        'returns': common.to_numpy(),
+        'mean': returns[included].mean().to_numpy(),
+        'cov': cov,
+        'corr': cov / np.outer(std, std).clip(min=1e-12),
+        'betas': full_cov[:-1, -1] / market_var if market_var > 0 else np.zeros(len(included)),
+    }
+
+    with _risk_lock:
+        # Keep only today's entries
+        for old_key in [k for k in _risk_cache if k[1] != key[1]]:
+            del _risk_cache[old_key]
+        _risk_cache[key] = stats
+    return stats
+
+def portfolio_risk(valuation, confidence=VAR_CONFIDENCE, benchmark=BENCHMARK):
+    """Volatility, beta, VaR/CVaR and per-holding risk contributions.
+
+    `valuation` is the table from value_portfolio. Lots are summed per
+    symbol into market-value weights; all figures are matrix operations
+    over the cached return statistics. VaR and CVaR are 1-day losses as
+    positive fractions of portfolio value. Holdings with too little history
+    are left out and listed in `short`; historical VaR/CVaR are None when
+    the rest share fewer than RISK_MIN_HISTORY_DAYS trading days.
+    """
+    by_symbol = valuation.groupby('symbol')['value'].sum()
+    by_symbol = by_symbol[by_symbol > 0]
+    if by_symbol.empty:
+        return None
+
+    stats = return_statistics(list(by_symbol.index), benchmark)
+    if not stats['symbols']:
+        return None
+    # Weights over the holdings with enough history to measure
+    weights = by_symbol.reindex(stats['symbols']).to_numpy()
+    weights = weights / weights.sum()
+
+    cov = stats['cov']
+    port_var = weights @ cov @ weights
+    port_vol = np.sqrt(port_var)
+
+    # Historical VaR/CVaR from the portfolio's own daily return distribution,
+    # only when the holdings share enough trading days for a meaningful tail
+    alpha = 1 - confidence
+    port_returns = stats['returns'] @ weights
+    if len(port_returns) >= RISK_MIN_HISTORY_DAYS:
+        cutoff = np.quantile(port_returns, alpha)
+        hist_var = -cutoff
+        hist_cvar = -port_returns[port_returns <= cutoff].mean()
+    else:
+        hist_var = hist_cvar = None
+
+    # Parametric (normal) VaR/CVaR
+    mu = stats['mean'] @ weights
+    z = NormalDist().inv_cdf(alpha)
+    param_var = -(mu + z * port_vol)
+    param_cvar = -(mu - port_vol * NormalDist().pdf(z) / alpha)
+
+    # Marginal and total risk contribution per holding (contributions sum to vol)
+    marginal = cov @ weights / port_vol if port_vol > 0 else np.zeros(len(weights))
+    contribution = weights * marginal
+
+    holdings = pd.DataFrame({
+        'weight': weights,
+        'volatility': np.sqrt(np.diag(cov) * TRADING_DAYS),
+        'beta': stats['betas'],
+        'marginal_risk': marginal * np.sqrt(TRADING_DAYS),
+        'risk_contribution': contribution / port_vol if port_vol > 0 else contribution,
+    }, index=pd.Index(stats['symbols'], name='symbol'))
+
+    return {
+        'volatility': port_vol * np.sqrt(TRADING_DAYS),
+        'beta': float(weights @ stats['betas']),
+        'hist_var': hist_var,
+        'hist_cvar': hist_cvar,
+        'param_var': param_var,
+        'param_cvar': param_cvar,
+        'confidence': confidence,
+        'days': len(stats['dates']),
+        'var_days': len(port_returns),
+        'short': stats['short'],
+        'corr': pd.DataFrame(stats['corr'], index=stats['symbols'], columns=stats['symbols']),
+        'holdings': holdings.sort_values('risk_contribution', ascending=False),
+    }
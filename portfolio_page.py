@@ -6,9 +6,17 @@ Right panel: Detailed stock analysis when clicked
 
 import streamlit as st
 import yfinance as yf
-from utils import search_stock_symbol, create_candlestick_chart
+from utils import (search_stock_symbol, create_candlestick_chart, create_performance_chart,
+                   create_correlation_heatmap, related_news, format_time_ago)
+from portfolio_analytics import (value_portfolio, equity_curve, period_returns, portfolio_risk,
+                                 holding_sparklines, BENCHMARK, RISK_MIN_HISTORY_DAYS)
+from market_data import QUOTE_TTL_SECONDS
+from datetime import date
 import pandas as pd
 
+# The quick view revalues on its own as often as quotes can change
+QUICK_VIEW_REFRESH_SECONDS = QUOTE_TTL_SECONDS
+
 class PortfolioPage:
     def __init__(self):
         """Initialize portfolio page"""
@@ -21,7 +29,7 @@ class PortfolioPage:
         
         # Top bar: Add position form
         with st.expander("➕ Add New Position", expanded=False):
-            add_col1, add_col2, add_col3, add_col4 = st.columns([2, 1, 1, 1])
+            add_col1, add_col2, add_col3, add_col_date, add_col4 = st.columns([2, 1, 1, 1, 1])
             
             with add_col1:
                 # Stock search with dropdown
@@ -57,17 +65,17 @@ class PortfolioPage:
                     buy_price = st.number_input("Price per Share ($)", value=100.0,
                                                step=0.01, format="%.2f", key="add_price")
             
+            with add_col_date:
+                buy_date = st.date_input("Buy Date", value=date.today(), max_value=date.today(),
+                                         key="add_date")
+            
             with add_col4:
                 st.write("")
                 st.write("")
                 if st.button("➕ Add", use_container_width=True, type="primary"):
                     if selected_symbol:
-                        st.session_state.portfolio.append({
-                            'symbol': selected_symbol,
-                            'shares': shares,
-                            'buy_price': buy_price
-                        })
-                        st.session_state.save_data()
+                        st.session_state.add_position(selected_symbol, shares, buy_price,
+                                                      buy_date.isoformat())
                         st.success(f"✅ Added {shares:.3f} shares of {selected_symbol}")
                         st.rerun()
         
@@ -81,49 +89,19 @@ class PortfolioPage:
             # Quick View Box
             st.markdown("### 📊 Quick View")
             
+            # One batch of sparklines for every holding and watchlist row
+            try:
+                sparks = holding_sparklines([p['symbol'] for p in st.session_state.portfolio]
+                                            + st.session_state.watchlist)
+            except Exception:
+                sparks = {}
+            
+            valuation = None
             if st.session_state.portfolio:
-                # Calculate totals
-                total_value = 0
-                total_cost = 0
-                
+                # Valuation for the holdings list - one batched price lookup for all lots
                 with st.spinner("Updating prices..."):
-                    for pos in st.session_state.portfolio:
-                        try:
-                            ticker = yf.Ticker(pos['symbol'])
-                            info = ticker.info
-                            current_price = info.get('currentPrice', info.get('regularMarketPrice', pos['buy_price']))
-                            pos['current_price'] = current_price
-                            pos['value'] = current_price * pos['shares']
-                            pos['cost'] = pos['buy_price'] * pos['shares']
-                            total_value += pos['value']
-                            total_cost += pos['cost']
-                        except:
-                            pos['current_price'] = pos['buy_price']
-                            pos['value'] = pos['buy_price'] * pos['shares']
-                            pos['cost'] = pos['buy_price'] * pos['shares']
-                
-                total_gl = total_value - total_cost
-                gl_pct = (total_gl / total_cost * 100) if total_cost > 0 else 0
-                
-                # Summary box
-                summary_box = st.container()
-                with summary_box:
-                    st.metric("Total Value", f"${total_value:,.2f}")
-                    st.metric("Total Cost", f"${total_cost:,.2f}")
-                    
-                    gl_color = "green" if total_gl >= 0 else "red"
-                    st.markdown(f"""
-                        <div style='background-color: #1a1a1a; padding: 15px; border-radius: 8px; 
-                                    border: 2px solid {gl_color}; margin: 10px 0;'>
-                            <div style='color: #888; font-size: 13px;'>Net Gain/Loss</div>
-                            <div style='color: {gl_color}; font-size: 24px; font-weight: bold;'>
-                                ${total_gl:,.2f}
-                            </div>
-                            <div style='color: {gl_color}; font-size: 16px;'>
-                                {gl_pct:+.2f}%
-                            </div>
-                        </div>
-                    """, unsafe_allow_html=True)
+                    valuation = value_portfolio(st.session_state.portfolio)
+                self.quick_view()
                 
                 # Filter
                 filter_query = st.text_input("🔍 Filter holdings", key="filter_holdings",
@@ -134,29 +112,35 @@ class PortfolioPage:
             # Your Holdings Section
             st.markdown("### 📁 Your Holdings")
             
-            if st.session_state.portfolio:
+            if valuation is not None:
                 # Filter if query exists
-                filtered_portfolio = st.session_state.portfolio
-                if 'filter_query' in locals() and filter_query:
-                    filtered_portfolio = [p for p in st.session_state.portfolio 
-                                        if filter_query.upper() in p['symbol'].upper()]
+                filtered = valuation
+                if filter_query:
+                    filtered = valuation[valuation['symbol'].str.upper().str.contains(filter_query.upper(), regex=False)]
                 
                 # Display each holding as clickable button
-                for idx, pos in enumerate(filtered_portfolio):
-                    gl = pos.get('value', 0) - pos.get('cost', 0)
-                    gl_pct = (gl / pos.get('cost', 1) * 100) if pos.get('cost', 0) > 0 else 0
-                    gl_color = "#00ff88" if gl >= 0 else "#ff4444"
-                    
+                for _, pos in filtered.iterrows():
                     # Clickable holding card
                     button_label = f"{pos['symbol']} • {pos['shares']:.2f} shares"
                     
-                    if st.button(button_label, key=f"holding_{idx}", use_container_width=True):
-                        st.session_state.selected_holding = pos['symbol']
-                        st.rerun()
+                    lot_id = int(pos['id'])
+                    card_col, remove_col = st.columns([5, 1])
+                    with card_col:
+                        if st.button(button_label, key=f"holding_{lot_id}", use_container_width=True):
+                            st.session_state.selected_holding = pos['symbol']
+                            st.rerun()
+                    with remove_col:
+                        # Keyed by ledger id, so a lot list reloaded after another
+                        # session's edit still removes the lot that was clicked
+                        if st.button("🗑️", key=f"remove_lot_{lot_id}", help="Remove this lot"):
+                            st.session_state.remove_position(lot_id)
+                            st.rerun()
                     
                     # Show mini stats below button
-                    st.caption(f"Value: ${pos.get('value', 0):,.2f} • "
-                             f"P/L: {gl_pct:+.1f}%")
+                    st.caption(f"Value: ${pos['value']:,.2f} • "
+                             f"P/L: {pos['gain_pct']:+.1f}%")
+                    if pos['symbol'] in sparks:
+                        st.markdown(f"<img src='{sparks[pos['symbol']]}'>", unsafe_allow_html=True)
                     st.markdown("---")
             else:
                 st.info("No holdings yet. Add your first position above!")
@@ -173,10 +157,11 @@ class PortfolioPage:
                         if st.button(symbol, key=f"watch_{symbol}", use_container_width=True):
                             st.session_state.selected_holding = symbol
                             st.rerun()
+                        if symbol in sparks:
+                            st.markdown(f"<img src='{sparks[symbol]}'>", unsafe_allow_html=True)
                     with col_b:
                         if st.button("🗑️", key=f"del_watch_{symbol}"):
-                            st.session_state.watchlist.remove(symbol)
-                            st.session_state.save_data()
+                            st.session_state.remove_from_watchlist(symbol)
                             st.rerun()
             else:
                 st.info("Watchlist empty")
@@ -185,6 +170,11 @@ class PortfolioPage:
         with right_col:
             if st.session_state.selected_holding:
                 self.display_detailed_analysis(st.session_state.selected_holding)
+            elif st.session_state.portfolio:
+                st.caption("Click any holding or watchlist stock for detailed analysis")
+                self.display_performance()
+                st.markdown("---")
+                self.display_risk(valuation)
             else:
                 # Show welcome message
                 st.markdown("""
@@ -200,6 +190,148 @@ class PortfolioPage:
                     </div>
                 """, unsafe_allow_html=True)
     
+    @st.fragment(run_every=QUICK_VIEW_REFRESH_SECONDS)
+    def quick_view(self):
+        """Portfolio totals, revalued in their own fragment as quotes refresh"""
+        # Calculate totals - one batched price lookup for all lots
+        valuation = value_portfolio(st.session_state.portfolio)
+        
+        total_value = valuation['value'].sum()
+        total_cost = valuation['cost'].sum()
+        total_gl = total_value - total_cost
+        gl_pct = (total_gl / total_cost * 100) if total_cost > 0 else 0
+        
+        # Summary box
+        summary_box = st.container()
+        with summary_box:
+            st.metric("Total Value", f"${total_value:,.2f}")
+            st.metric("Total Cost", f"${total_cost:,.2f}")
+            
+            gl_color = "green" if total_gl >= 0 else "red"
+            st.markdown(f"""
+                <div style='background-color: #1a1a1a; padding: 15px; border-radius: 8px; 
+                            border: 2px solid {gl_color}; margin: 10px 0;'>
+                    <div style='color: #888; font-size: 13px;'>Net Gain/Loss</div>
+                    <div style='color: {gl_color}; font-size: 24px; font-weight: bold;'>
+                        ${total_gl:,.2f}
+                    </div>
+                    <div style='color: {gl_color}; font-size: 16px;'>
+                        {gl_pct:+.2f}%
+                    </div>
+                </div>
+            """, unsafe_allow_html=True)
+    
+    def display_performance(self):
+        """Equity curve, period returns and drawdown vs the benchmark"""
+        st.markdown("### 📈 Portfolio Performance")
+        
+        try:
+            with st.spinner("Loading price history..."):
+                curve = equity_curve(st.session_state.portfolio)
+        except Exception as e:
+            st.error(f"Error loading performance: {str(e)}")
+            return
+        
+        if curve.empty:
+            st.info("Not enough price history yet")
+            return
+        
+        returns = period_returns(curve['index'])
+        bench_returns = period_returns(curve['benchmark'])
+        
+        cols = st.columns(len(returns))
+        for col, (label, ret) in zip(cols, returns.items()):
+            with col:
+                bench = bench_returns.get(label)
+                st.metric(label, f"{ret*100:+.1f}%",
+                          delta=f"{(ret - bench)*100:+.1f}% vs {BENCHMARK}" if bench is not None else None)
+        
+        dd_col1, dd_col2 = st.columns(2)
+        with dd_col1:
+            st.metric("Max Drawdown", f"{curve['drawdown'].min()*100:.1f}%")
+        with dd_col2:
+            st.metric("Current Drawdown", f"{curve['drawdown'].iloc[-1]*100:.1f}%")
+        
+        fig = create_performance_chart(curve, BENCHMARK)
+        if fig:
+            st.plotly_chart(fig, use_container_width=True)
+        
+        if any('buy_date' not in pos for pos in st.session_state.portfolio):
+            st.caption("ℹ️ Lots added before buy dates were tracked are assumed held for the past year.")
+    
+    def display_risk(self, valuation):
+        """Volatility, beta, VaR/CVaR, correlations and risk contributions"""
+        st.markdown("### ⚠️ Portfolio Risk")
+        
+        try:
+            with st.spinner("Computing risk..."):
+                risk = portfolio_risk(valuation)
+        except Exception as e:
+            st.error(f"Error computing risk: {str(e)}")
+            return
+        
+        if risk is None:
+            st.info("Not enough price history yet")
+            return
+        
+        conf = f"{risk['confidence']*100:.0f}%"
+        st.caption(f"Based on {risk['days']} trading days • 1-day VaR/CVaR at {conf} as % of portfolio value")
+        if risk['short']:
+            st.caption(f"ℹ️ Left out (under {RISK_MIN_HISTORY_DAYS} days of history): {', '.join(risk['short'])}")
+        
+        risk_col1, risk_col2, risk_col3 = st.columns(3)
+        with risk_col1:
+            st.metric("Volatility (ann.)", f"{risk['volatility']*100:.1f}%")
+            st.metric(f"Beta vs {BENCHMARK}", f"{risk['beta']:.2f}")
+        with risk_col2:
+            if risk['hist_var'] is not None:
+                st.metric("Historical VaR", f"{risk['hist_var']*100:.2f}%")
+                st.metric("Historical CVaR", f"{risk['hist_cvar']*100:.2f}%")
+            else:
+                st.metric("Historical VaR", "N/A", help=f"Needs {RISK_MIN_HISTORY_DAYS} days all holdings traded; "
+                                                        f"have {risk['var_days']}")
+                st.metric("Historical CVaR", "N/A")
+        with risk_col3:
+            st.metric("Parametric VaR", f"{risk['param_var']*100:.2f}%")
+            st.metric("Parametric CVaR", f"{risk['param_cvar']*100:.2f}%")
+        
+        st.markdown("**Risk Contribution by Holding**")
+        holdings = risk['holdings'].copy()
+        for col in ('weight', 'volatility', 'marginal_risk', 'risk_contribution'):
+            holdings[col] = holdings[col] * 100
+        st.dataframe(
+            holdings.round(2).rename(columns={
+                'weight': 'Weight %', 'volatility': 'Vol %', 'beta': 'Beta',
+                'marginal_risk': 'Marginal Risk %', 'risk_contribution': 'Risk Share %',
+            }),
+            use_container_width=True
+        )
+        
+        if len(risk['corr']) > 1:
+            fig = create_correlation_heatmap(risk['corr'])
+            if fig:
+                st.plotly_chart(fig, use_container_width=True)
+    
+    @st.fragment
+    def price_chart(self, symbol):
+        """Candlestick chart; changing the timeframe reruns only this fragment"""
+        st.markdown("### 📈 Price Chart")
+        
+        timeframe_opt = st.radio("Timeframe", ["1M", "3M", "6M", "1Y", "5Y"], 
+                                index=2, horizontal=True, key="chart_tf")
+        
+        tf_map = {"1M": "1mo", "3M": "3mo", "6M": "6mo", "1Y": "1y", "5Y": "5y"}
+        try:
+            chart_hist = yf.Ticker(symbol).history(period=tf_map[timeframe_opt])
+        except Exception as e:
+            st.error(f"Error loading chart for {symbol}: {str(e)}")
+            return
+        
+        if not chart_hist.empty:
+            fig = create_candlestick_chart(symbol, chart_hist, tf_map[timeframe_opt])
+            if fig:
+                st.plotly_chart(fig, use_container_width=True)
+    
     def display_detailed_analysis(self, symbol):
         """Display detailed analysis in right panel"""
         try:
@@ -225,18 +357,7 @@ class PortfolioPage:
             st.markdown("---")
             
             # Price Chart
-            st.markdown("### 📈 Price Chart")
-            
-            timeframe_opt = st.radio("Timeframe", ["1M", "3M", "6M", "1Y", "5Y"], 
-                                    index=2, horizontal=True, key="chart_tf")
-            
-            tf_map = {"1M": "1mo", "3M": "3mo", "6M": "6mo", "1Y": "1y", "5Y": "5y"}
-            chart_hist = ticker.history(period=tf_map[timeframe_opt])
-            
-            if not chart_hist.empty:
-                fig = create_candlestick_chart(symbol, chart_hist, tf_map[timeframe_opt])
-                if fig:
-                    st.plotly_chart(fig, use_container_width=True)
+            self.price_chart(symbol)
             
             st.markdown("---")
             
@@ -356,5 +477,18 @@ class PortfolioPage:
             else:
                 st.info("No significant insights at this time")
             
+            st.markdown("---")
+            
+            # Related news from articles the app has already collected
+            st.markdown("### 📰 Related News")
+            news = related_news(symbol, 5)
+            if news:
+                for article in news:
+                    st.markdown(f"**{article.get('title', 'No title')}**")
+                    source = article.get('source', {}).get('name', 'Unknown')
+                    st.caption(f"📡 {source} • {format_time_ago(article.get('publishedAt', ''))}")
+            else:
+                st.caption("No recent articles mention this stock yet. Browse the Research page to collect more news.")
+            
         except Exception as e:
             st.error(f"Error loading data for {symbol}: {str(e)}")
@@ -4,8 +4,10 @@ Research Page - FIXED: No buttons inside forms
 
 import streamlit as st
 import yfinance as yf
-from utils import (get_news_from_api, format_time_ago, create_candlestick_chart, 
-                   search_stock_symbol, generate_article_summary)
+from concurrent.futures import ThreadPoolExecutor
+from utils import (get_news_from_api, prefetch_news, search_news, related_news, dedupe_articles,
+                   format_time_ago, create_candlestick_chart, search_stock_symbol, generate_article_summary,
+                   NEWS_INDEX_MIN_HITS)
 from datetime import datetime
 
 class ResearchPage:
@@ -94,15 +96,16 @@ class ResearchPage:
             "Food": tab_food
         }
         
+        # All feeds load in parallel; the tabs render from the gathered results
+        with st.spinner("📡 Loading..."):
+            news = prefetch_news(categories.values(), 50)
+        
         for category_name, tab in tabs_map.items():
             with tab:
-                self.display_category_news(categories[category_name])
+                self.display_category_news(news[categories[category_name]])
     
-    def display_category_news(self, query):
+    def display_category_news(self, articles):
         """Display news for category"""
-        with st.spinner("📡 Loading..."):
-            articles = get_news_from_api(query, 50, st.session_state.news_cache)
-        
         if articles:
             for article in articles[:25]:
                 st.markdown(f"**{article.get('title', 'No title')}**")
@@ -123,7 +126,7 @@ class ResearchPage:
         st.markdown(f"### 📰 Results: '{query}'")
         
         with st.spinner("🔍 Searching..."):
-            articles = get_news_from_api(query, 30, st.session_state.news_cache)
+            articles = search_news(query, 30)
         
         if articles:
             for article in articles[:20]:
@@ -143,8 +146,36 @@ class ResearchPage:
         if st.button("⬅️ Back"):
             st.rerun()
     
+    @st.fragment
+    def price_chart(self, symbol):
+        """Candlestick chart; changing the timeframe reruns only this fragment"""
+        st.markdown("### 📈 Price Chart")
+        
+        timeframes = {"5D": "5d", "1M": "1mo", "3M": "3mo", "6M": "6mo", "1Y": "1y", "5Y": "5y"}
+        selected_tf = st.radio("", list(timeframes.keys()), index=2, horizontal=True, key="research_tf")
+        
+        try:
+            chart_hist = yf.Ticker(symbol).history(period=timeframes[selected_tf])
+        except Exception as e:
+            st.error(f"Error loading chart for {symbol}: {str(e)}")
+            return
+        
+        if not chart_hist.empty:
+            fig = create_candlestick_chart(symbol, chart_hist, timeframes[selected_tf])
+            if fig:
+                st.plotly_chart(fig, use_container_width=True)
+    
     def display_stock_research(self, symbol):
         """Display stock research"""
+        # Articles already collected by other feeds cost nothing; only fetch the
+        # stock's own feed when there are too few, overlapped with quote loading
+        stock_news = related_news(symbol, 10)
+        news_future = None
+        if len(stock_news) < NEWS_INDEX_MIN_HITS:
+            news_executor = ThreadPoolExecutor(max_workers=1)
+            news_future = news_executor.submit(get_news_from_api, f"{symbol} stock", 10)
+            news_executor.shutdown(wait=False)
+        
         try:
             ticker = yf.Ticker(symbol)
             info = ticker.info
@@ -162,26 +193,15 @@ class ResearchPage:
             with col_h2:
                 if symbol in st.session_state.watchlist:
                     if st.button("⭐ Remove", key="watch_btn"):
-                        st.session_state.watchlist.remove(symbol)
-                        st.session_state.save_data()
+                        st.session_state.remove_from_watchlist(symbol)
                         st.rerun()
                 else:
                     if st.button("☆ Add Watchlist", key="watch_btn", type="primary"):
-                        st.session_state.watchlist.append(symbol)
-                        st.session_state.save_data()
+                        st.session_state.add_to_watchlist(symbol)
                         st.rerun()
             
             st.markdown("---")
-            st.markdown("### 📈 Price Chart")
-            
-            timeframes = {"5D": "5d", "1M": "1mo", "3M": "3mo", "6M": "6mo", "1Y": "1y", "5Y": "5y"}
-            selected_tf = st.radio("", list(timeframes.keys()), index=2, horizontal=True)
-            
-            chart_hist = ticker.history(period=timeframes[selected_tf])
-            if not chart_hist.empty:
-                fig = create_candlestick_chart(symbol, chart_hist, timeframes[selected_tf])
-                if fig:
-                    st.plotly_chart(fig, use_container_width=True)
+            self.price_chart(symbol)
             
             st.markdown("---")
             st.markdown("### 📊 Statistics")
@@ -212,8 +232,9 @@ class ResearchPage:
             st.markdown("---")
             st.markdown(f"### 📰 {symbol} News")
             
-            with st.spinner("Loading news..."):
-                stock_news = get_news_from_api(f"{symbol} stock", 10, st.session_state.news_cache)
+            if news_future is not None:
+                with st.spinner("Loading news..."):
+                    stock_news = dedupe_articles(stock_news + news_future.result())[:10]
             
             if stock_news:
                 for article in stock_news[:8]:
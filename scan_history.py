@@ -0,0 +1,143 @@
+"""
+Scan History for SharkFin
+Stored ranking snapshots and scan-to-scan change feeds
+"""
+
+import os
+import json
+from datetime import datetime, timedelta
+import pandas as pd
+from scanner import SCAN_DIR
+
+SNAPSHOT_DIR = os.path.join(SCAN_DIR, 'snapshots')
+SNAPSHOT_FORMAT = 'scan_%Y%m%d_%H%M%S.pkl'
+MAX_SNAPSHOTS = 120
+
+SNAPSHOT_COLUMNS = ['name', 'sector', 'price', 'total_score', 'change_1m']
+
+# Feed ordering and labels
+EVENTS = {
+    'new_buy': "🚀 New top buy",
+    'new_sell': "🚨 New top sell",
+    'flip_negative': "📉 Score flipped negative",
+    'flip_positive': "📈 Score flipped positive",
+    'left_buys': "⬇️ Dropped out of top buys",
+    'left_sells': "⬆️ Left top sells",
+    'rank_jump': "↕️ Big rank move",
+}
+
+# ============================================================================
+# SNAPSHOTS
+# ============================================================================
+
+def save_snapshot(table, taken_at):
+    """Persist a scan's ranking; re-saving the same scan overwrites it"""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = os.path.join(SNAPSHOT_DIR, taken_at.strftime(SNAPSHOT_FORMAT))
+    table[SNAPSHOT_COLUMNS].to_pickle(path)
+
+    # Keep the directory bounded
+    for _, old_path in list_snapshots()[:-MAX_SNAPSHOTS]:
+        os.remove(old_path)
+    return path
+
+def list_snapshots():
+    """(taken_at, path) for every stored snapshot, oldest first"""
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return []
+    snapshots = []
+    for filename in os.listdir(SNAPSHOT_DIR):
+        try:
+            taken_at = datetime.strptime(filename, SNAPSHOT_FORMAT)
+        except ValueError:
+            continue
+        snapshots.append((taken_at, os.path.join(SNAPSHOT_DIR, filename)))
+    return sorted(snapshots)
+
+def find_snapshot(before, days_ago=0):
+    """Latest snapshot taken before `before` minus days_ago days, or None"""
+    # Snapshot names have whole-second precision; the current scan's own
+    # snapshot must not count as "before" it
+    cutoff = (before - timedelta(days=days_ago)).replace(microsecond=0)
+    earlier = [s for s in list_snapshots() if s[0] < cutoff]
+    if not earlier:
+        return None
+    taken_at, path = earlier[-1]
+    return taken_at, pd.read_pickle(path)
+
+# ============================================================================
+# DIFF ENGINE
+# ============================================================================
+
+def rank_table(table, top_n=5):
+    """Score rank per symbol (1 = best) plus top-buy/top-sell membership.
+
+    Ties break alphabetically so the ranking is deterministic.
+    """
+    ranked = table[['name', 'total_score']].sort_index()
+    ranked['rank'] = ranked['total_score'].rank(ascending=False, method='first').astype('int32')
+    from_bottom = len(ranked) - ranked['rank'] + 1
+    ranked['top_buy'] = (ranked['rank'] <= top_n) & (ranked['total_score'] > 0)
+    ranked['top_sell'] = (from_bottom <= top_n) & (ranked['total_score'] < 0)
+    return ranked
+
+def diff_rankings(current, previous, top_n=5, jump=50):
+    """Join two rankings on symbol and flag what changed.
+
+    Returns one row per symbol present in either scan with current and
+    previous score/rank, rank_change (positive = moved up) and a boolean
+    column per event in EVENTS.
+    """
+    now = rank_table(current, top_n)
+    before = rank_table(previous, top_n)
+    joined = now.join(before, how='outer', rsuffix='_prev')
+    joined['name'] = joined['name'].fillna(joined['name_prev'])
+
+    in_now = joined['rank'].notna()
+    in_before = joined['rank_prev'].notna()
+    # Symbols missing from one side come back as NaN; eq(True) treats them as False
+    top_buy, top_buy_prev = joined['top_buy'].eq(True), joined['top_buy_prev'].eq(True)
+    top_sell, top_sell_prev = joined['top_sell'].eq(True), joined['top_sell_prev'].eq(True)
+
+    joined['rank_change'] = joined['rank_prev'] - joined['rank']
+    joined['new_buy'] = top_buy & ~top_buy_prev
+    joined['left_buys'] = top_buy_prev & ~top_buy & in_now
+    joined['new_sell'] = top_sell & ~top_sell_prev
+    joined['left_sells'] = top_sell_prev & ~top_sell & in_now
+    joined['flip_negative'] = (joined['total_score_prev'] > 0) & (joined['total_score'] < 0)
+    joined['flip_positive'] = (joined['total_score_prev'] < 0) & (joined['total_score'] > 0)
+    joined['rank_jump'] = in_now & in_before & (joined['rank_change'].abs() >= jump)
+
+    return joined.drop(columns=['name_prev', 'top_buy', 'top_buy_prev', 'top_sell', 'top_sell_prev'])
+
+def change_feed(diff):
+    """Compact list of change events, most important first"""
+    feed = []
+    for event in EVENTS:
+        rows = diff[diff[event]]
+        if event == 'rank_jump':
+            rows = rows.reindex(rows['rank_change'].abs().sort_values(ascending=False).index)
+        else:
+            rows = rows.sort_values('rank')
+        for symbol, row in rows.iterrows():
+            feed.append({
+                'symbol': symbol,
+                'event': event,
+                'name': row['name'],
+                'score': _int_or_none(row['total_score']),
+                'score_prev': _int_or_none(row['total_score_prev']),
+                'rank': _int_or_none(row['rank']),
+                'rank_prev': _int_or_none(row['rank_prev']),
+            })
+    return feed
+
+def change_feed_json(feed, current_time, previous_time):
+    """Serialize a change feed with the two scan timestamps"""
+    return json.dumps({
+        'current_scan': current_time.isoformat(),
+        'previous_scan': previous_time.isoformat(),
+        'changes': feed,
+    }, indent=2)
+
+def _int_or_none(value):
+    return None if pd.isna(value) else int(value)
@@ -0,0 +1,527 @@
+"""
+Market Scan Engine for SharkFin
+Checkpointed, resumable, memory-bounded scans used by the Top Performers page
+"""
+
+import os
+import json
+import time
+import random
+import threading
+import concurrent.futures
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+SCAN_DIR = 'scan_data'
+CHECKPOINT_FILE = os.path.join(SCAN_DIR, 'scan_checkpoint.jsonl')
+
+# A checkpoint older than this is treated as a new scan, not a resume
+CHECKPOINT_MAX_AGE_HOURS = 12
+
+# Per-symbol scan metrics. 'label' = free text, 'category' = repeated label
+# stored as a small integer code; everything else is a numpy dtype.
+SCAN_SCHEMA = {
+    'name': 'label',
+    'sector': 'category',
+    'industry': 'category',
+    'price': 'float32',
+    'total_score': 'int8',
+    'tech_score': 'int8',
+    'fund_score': 'int8',
+    'ml_score': 'int8',
+    'rsi': 'float32',
+    'ma_20': 'float32',
+    'ma_50': 'float32',
+    'volume_ratio': 'float32',
+    'pe': 'float32',
+    'growth': 'float32',
+    'margin': 'float32',
+    'change_1w': 'float32',
+    'change_1m': 'float32',
+}
+
+# ============================================================================
+# METRIC STORE
+# ============================================================================
+
+def to_float(value):
+    """Numeric value as float, NaN for missing or non-numeric ('Infinity', None)"""
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else float('nan')
+
+class MetricStore:
+    """Symbol-keyed, column-oriented storage for scan results.
+
+    Numeric columns are preallocated numpy arrays that grow geometrically,
+    so a 5,000-symbol scan costs a few hundred KB instead of thousands of
+    dicts. Rows read back as dicts, which lets it stand in for the
+    {symbol: result} dict it replaces.
+    """
+
+    def __init__(self, schema, capacity=1024):
+        self.schema = schema
+        self._index = {}
+        self._symbols = []
+        self._count = 0
+        self._valid = np.zeros(capacity, dtype=bool)
+        self._arrays = {}
+        self._labels = {}
+        self._categories = {}
+        self._category_names = {}
+        for col, kind in schema.items():
+            if kind == 'label':
+                self._labels[col] = []
+            elif kind == 'category':
+                self._arrays[col] = np.full(capacity, -1, dtype='int16')
+                self._categories[col] = {}
+                self._category_names[col] = []
+            else:
+                self._arrays[col] = np.zeros(capacity, dtype=kind)
+
+    def _grow(self):
+        capacity = len(self._valid) * 2
+        self._valid = np.resize(self._valid, capacity)
+        self._valid[len(self._symbols):] = False
+        for col, array in self._arrays.items():
+            self._arrays[col] = np.resize(array, capacity)
+
+    def __setitem__(self, symbol, record):
+        row = self._index.get(symbol)
+        if row is None:
+            row = len(self._symbols)
+            if row == len(self._valid):
+                self._grow()
+            self._index[symbol] = row
+            self._symbols.append(symbol)
+            for labels in self._labels.values():
+                labels.append(None)
+
+        for col, kind in self.schema.items():
+            value = record.get(col)
+            if kind == 'label':
+                self._labels[col][row] = value
+            elif kind == 'category':
+                codes = self._categories[col]
+                if value is None:
+                    self._arrays[col][row] = -1
+                else:
+                    if value not in codes:
+                        codes[value] = len(codes)
+                        self._category_names[col].append(value)
+                    self._arrays[col][row] = codes[value]
+            else:
+                value = to_float(value)
+                if kind.startswith('int'):
+                    value = 0 if np.isnan(value) else value
+                self._arrays[col][row] = value
+
+        if not self._valid[row]:
+            self._valid[row] = True
+            self._count += 1
+
+    def __getitem__(self, symbol):
+        row = self._index[symbol]
+        if not self._valid[row]:
+            raise KeyError(symbol)
+        record = {'symbol': symbol}
+        for col, kind in self.schema.items():
+            if kind == 'label':
+                record[col] = self._labels[col][row]
+            elif kind == 'category':
+                code = self._arrays[col][row]
+                record[col] = self._category_names[col][code] if code >= 0 else None
+            else:
+                record[col] = self._arrays[col][row].item()
+        return record
+
+    def __contains__(self, symbol):
+        row = self._index.get(symbol)
+        return row is not None and bool(self._valid[row])
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return (s for s in self._symbols if s in self)
+
+    def pop(self, symbol, default=None):
+        if symbol not in self:
+            return default
+        record = self[symbol]
+        self._valid[self._index[symbol]] = False
+        self._count -= 1
+        return record
+
+    def values(self):
+        return (self[s] for s in self)
+
+    def to_frame(self):
+        """Symbol-indexed DataFrame built directly from the column arrays"""
+        rows = np.flatnonzero(self._valid[:len(self._symbols)])
+        data = {}
+        for col, kind in self.schema.items():
+            if kind == 'label':
+                labels = self._labels[col]
+                data[col] = [labels[r] for r in rows]
+            elif kind == 'category':
+                data[col] = pd.Categorical.from_codes(self._arrays[col][rows],
+                                                      categories=self._category_names[col])
+            else:
+                data[col] = self._arrays[col][rows]
+        index = pd.Index([self._symbols[r] for r in rows], name='symbol')
+        return pd.DataFrame(data, index=index)
+
+# ============================================================================
+# CHECKPOINT
+# ============================================================================
+
+class ScanCheckpoint:
+    """Append-only JSON-lines record of every symbol's scan outcome.
+
+    Each finished symbol is written as one line the moment it completes, so
+    an interrupted scan (throttling, crash, Streamlit rerun) keeps all of
+    its earlier work. Later lines for the same symbol win, which lets a
+    retry overwrite an earlier failure.
+
+    With a schema, results are held in a MetricStore; pass schema=None to
+    keep them as plain dicts.
+    """
+
+    def __init__(self, path=CHECKPOINT_FILE, max_age_hours=CHECKPOINT_MAX_AGE_HOURS, schema=SCAN_SCHEMA):
+        self.path = path
+        self.max_age_hours = max_age_hours
+        self.schema = schema
+        self.load()
+
+    def _new_results(self):
+        return MetricStore(self.schema) if self.schema else {}
+
+    def load(self):
+        """Rebuild state from the checkpoint file"""
+        self.started = None
+        self.results = self._new_results()
+        self.skipped = {}
+        self.failures = {}
+
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn last line from an interrupted write
+                    continue
+
+                kind = entry.get('type')
+                symbol = entry.get('symbol')
+                if kind == 'start':
+                    self.started = datetime.fromisoformat(entry['time'])
+                    continue
+
+                self.results.pop(symbol, None)
+                self.skipped.pop(symbol, None)
+                self.failures.pop(symbol, None)
+                if kind == 'ok':
+                    self.results[symbol] = entry['result']
+                elif kind == 'skipped':
+                    self.skipped[symbol] = entry['reason']
+                elif kind == 'failed':
+                    self.failures[symbol] = entry['error']
+
+    def _append(self, entry):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(entry, default=float) + '\n')
+
+    def reset(self):
+        """Discard previous outcomes and start a new scan"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.started = datetime.now()
+        self.results = self._new_results()
+        self.skipped = {}
+        self.failures = {}
+        with open(self.path, 'w') as f:
+            f.write(json.dumps({'type': 'start', 'time': self.started.isoformat()}) + '\n')
+
+    def record_result(self, symbol, result):
+        self.failures.pop(symbol, None)
+        self.results[symbol] = result
+        self._append({'type': 'ok', 'symbol': symbol, 'result': result})
+
+    def record_skip(self, symbol, reason):
+        self.failures.pop(symbol, None)
+        self.skipped[symbol] = reason
+        self._append({'type': 'skipped', 'symbol': symbol, 'reason': reason})
+
+    def record_failure(self, symbol, error):
+        self.failures[symbol] = error
+        self._append({'type': 'failed', 'symbol': symbol, 'error': error})
+
+    def pending_symbols(self, symbols):
+        """Symbols with no successful or skipped outcome yet (includes failures)"""
+        return [s for s in symbols if s not in self.results and s not in self.skipped]
+
+    def unattempted_symbols(self, symbols):
+        """Symbols with no outcome at all yet; failed ones have been attempted"""
+        return [s for s in symbols
+                if s not in self.results and s not in self.skipped and s not in self.failures]
+
+    def is_complete(self, symbols):
+        """True once every symbol has an outcome (ok, skipped or failed after retries)"""
+        return not self.unattempted_symbols(symbols)
+
+    def is_stale(self):
+        if self.started is None:
+            return True
+        return datetime.now() - self.started > timedelta(hours=self.max_age_hours)
+
+    def is_resumable(self, symbols):
+        """True when a recent scan stopped before attempting all of these symbols.
+
+        Symbols that failed after their retries don't count; retrying them is
+        a separate step.
+        """
+        return not self.is_stale() and not self.is_complete(symbols)
+
+# ============================================================================
+# SCAN RUNNER
+# ============================================================================
+
+# Sessions share one checkpoint file, so only one market scan runs per process
+_scan_lock = threading.Lock()
+
+def try_begin_scan():
+    """Claim the process-wide scan slot; False if another session holds it"""
+    return _scan_lock.acquire(blocking=False)
+
+def end_scan():
+    _scan_lock.release()
+
+def scan_in_progress():
+    return _scan_lock.locked()
+
+def analyze_with_retry(analyze, symbol, max_attempts=3, base_delay=1.0):
+    """Call analyze(symbol), retrying failures with exponential backoff and jitter"""
+    for attempt in range(max_attempts):
+        try:
+            return analyze(symbol)
+        except Exception:
+            if attempt == max_attempts - 1:
+                raise
+            time.sleep(base_delay * (2 ** attempt) + random.uniform(0, base_delay))
+
+def run_scan(symbols, analyze, checkpoint, on_progress=None, max_workers=10, max_attempts=3):
+    """Analyze symbols in parallel, checkpointing each outcome as it finishes.
+
+    analyze(symbol) returns a result dict, or None when the symbol has too
+    little data to score. Exceptions that survive the retries are recorded
+    as failures with their message instead of being swallowed.
+
+    Symbols are consumed lazily and only a small window of work is in
+    flight, so peak memory stays flat no matter how large the universe is.
+    """
+    total = len(symbols) if hasattr(symbols, '__len__') else None
+    pending = iter(symbols)
+    window = max_workers * 2
+    in_flight = {}
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+
+    def submit_next():
+        for symbol in pending:
+            in_flight[executor.submit(analyze_with_retry, analyze, symbol, max_attempts)] = symbol
+            return
+
+    try:
+        for _ in range(window):
+            submit_next()
+
+        completed = 0
+        while in_flight:
+            done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                symbol = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    checkpoint.record_failure(symbol, f"{type(e).__name__}: {e}")
+                else:
+                    if result is None:
+                        checkpoint.record_skip(symbol, "Insufficient price history")
+                    else:
+                        checkpoint.record_result(symbol, result)
+
+                completed += 1
+                if on_progress:
+                    on_progress(completed, total)
+                submit_next()
+    finally:
+        # Don't block a Streamlit rerun on queued work; the checkpoint has it
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return checkpoint
+
+# ============================================================================
+# SCORING
+# ============================================================================
+
+def score_stock(m, reasons=None):
+    """Apply the technical, fundamental and momentum rules to one metrics row.
+
+    Returns (tech_score, fund_score, ml_score). Reason text is only built
+    when a {'tech': [], 'fund': [], 'ml': []} dict is passed, so the scan
+    stores numbers and the page regenerates reasons for the few stocks it
+    displays.
+    """
+    def note(key, template, *args):
+        if reasons is not None:
+            reasons[key].append(template.format(*args))
+
+    rsi, price, ma_20, ma_50 = m['rsi'], m['price'], m['ma_20'], m['ma_50']
+
+    # TECHNICAL SCORE
+    tech_score = 0
+    if rsi < 30:
+        tech_score += 3
+        note('tech', "RSI oversold (<30)")
+    elif rsi < 40:
+        tech_score += 2
+        note('tech', "RSI below 40")
+    elif rsi > 70:
+        tech_score -= 3
+        note('tech', "RSI overbought (>70)")
+    elif rsi > 60:
+        tech_score -= 2
+        note('tech', "RSI above 60")
+
+    if price > ma_20 > ma_50:
+        tech_score += 2
+        note('tech', "Bullish MA trend")
+    elif price > ma_20:
+        tech_score += 1
+        note('tech', "Above MA(20)")
+    elif price < ma_20:
+        tech_score -= 1
+        note('tech', "Below MA(20)")
+
+    if m['volume_ratio'] > 1.5:
+        tech_score += 1
+        note('tech', "High volume")
+
+    # FUNDAMENTAL SCORE (NaN fails every comparison, so missing data scores 0)
+    pe, growth, margin = m['pe'], m['growth'], m['margin']
+    fund_score = 0
+    if 0 < pe < 15:
+        fund_score += 2
+        note('fund', "Low P/E ({:.1f})", pe)
+    elif 15 <= pe < 25:
+        fund_score += 1
+        note('fund', "Fair P/E ({:.1f})", pe)
+    elif pe > 35:
+        fund_score -= 2
+        note('fund', "High P/E ({:.1f})", pe)
+
+    if growth > 0.15:
+        fund_score += 2
+        note('fund', "Strong growth ({:.0f}%)", growth * 100)
+    elif growth > 0.05:
+        fund_score += 1
+        note('fund', "Positive growth ({:.0f}%)", growth * 100)
+    elif growth < -0.1:
+        fund_score -= 2
+        note('fund', "Declining earnings ({:.0f}%)", growth * 100)
+
+    if margin > 0.15:
+        fund_score += 1
+        note('fund', "High margins ({:.0f}%)", margin * 100)
+
+    # ML MOMENTUM SCORE
+    month_change, week_change = m['change_1m'] / 100, m['change_1w'] / 100
+    ml_score = 0
+    if month_change > 0.15:
+        ml_score += 3
+        note('ml', "Strong 1M momentum (+{:.0f}%)", month_change * 100)
+    elif month_change > 0.05:
+        ml_score += 1
+        note('ml', "Positive 1M trend (+{:.0f}%)", month_change * 100)
+    elif month_change < -0.15:
+        ml_score -= 3
+        note('ml', "Weak 1M momentum ({:.0f}%)", month_change * 100)
+    elif month_change < -0.05:
+        ml_score -= 1
+        note('ml', "Negative 1M trend ({:.0f}%)", month_change * 100)
+
+    if week_change > 0.05:
+        ml_score += 1
+        note('ml', "Weekly momentum (+{:.0f}%)", week_change * 100)
+    elif week_change < -0.05:
+        ml_score -= 1
+        note('ml', "Weekly decline ({:.0f}%)", week_change * 100)
+
+    return tech_score, fund_score, ml_score
+
+def explain_stock(m):
+    """Reason text for one metrics row, generated on demand for display"""
+    reasons = {'tech': [], 'fund': [], 'ml': []}
+    score_stock(m, reasons)
+    return {
+        'tech_reasons': reasons['tech'][:3],
+        'fund_reasons': reasons['fund'][:2],
+        'ml_reasons': reasons['ml'][:2],
+    }
+
+# ============================================================================
+# METRICS TABLE & SECTOR AGGREGATES
+# ============================================================================
+
+def build_metrics_table(results):
+    """Build the compact per-symbol metrics table from a MetricStore or result dicts"""
+    if isinstance(results, MetricStore):
+        table = results.to_frame()
+    else:
+        records = list(results.values()) if isinstance(results, dict) else list(results)
+        table = pd.DataFrame(records, columns=['symbol'] + list(SCAN_SCHEMA)).set_index('symbol')
+
+    for col, kind in SCAN_SCHEMA.items():
+        if kind == 'category':
+            table[col] = table[col].astype(object).fillna('Unknown').astype('category')
+        elif kind != 'label':
+            values = pd.to_numeric(table[col], errors='coerce')
+            if kind.startswith('int'):
+                values = values.fillna(0)
+            table[col] = values.astype(kind)
+
+    return table
+
+def group_summary(table, by='sector', top_n=3):
+    """Aggregate the metrics table per sector or industry.
+
+    Columns: stocks, mean_score, breadth (share of names with a positive
+    score), advancers (share up over 1M), mean and dispersion of 1M
+    momentum, and the top_n names by score.
+    """
+    flags = table.assign(bullish=table['total_score'] > 0, advancing=table['change_1m'] > 0)
+    grouped = flags.groupby(by, observed=True)
+
+    summary = grouped.agg(
+        stocks=('total_score', 'size'),
+        mean_score=('total_score', 'mean'),
+        breadth=('bullish', 'mean'),
+        advancers=('advancing', 'mean'),
+        momentum_1m=('change_1m', 'mean'),
+        momentum_dispersion=('change_1m', 'std'),
+    )
+
+    leaders = (table.sort_values('total_score', ascending=False)
+               .groupby(by, observed=True)
+               .head(top_n)
+               .reset_index()
+               .groupby(by, observed=True)['symbol']
+               .agg(', '.join))
+    summary['top_names'] = leaders
+
+    return summary.sort_values('mean_score', ascending=False)
+
+def group_members(table, value, by='sector'):
+    """Rows of the metrics table belonging to one sector or industry, best first"""
+    return table[table[by] == value].sort_values('total_score', ascending=False)
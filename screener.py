@@ -0,0 +1,265 @@
+"""
+Fundamentals Table & Screener for SharkFin
+Cached columnar fundamentals for the whole universe plus a vectorized filter language
+"""
+
+import os
+import re
+import time
+import operator
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from scanner import SCAN_DIR, CHECKPOINT_FILE, MetricStore, ScanCheckpoint, run_scan, build_metrics_table
+
+FUNDAMENTALS_FILE = os.path.join(SCAN_DIR, 'fundamentals.pkl')
+FUNDAMENTALS_CHECKPOINT = os.path.join(SCAN_DIR, 'fundamentals_checkpoint.jsonl')
+FUNDAMENTALS_MAX_AGE_HOURS = 24
+
+# ticker.info key -> (column, dtype)
+FUNDAMENTAL_FIELDS = {
+    'trailingPE': ('pe', 'float32'),
+    'pegRatio': ('peg', 'float32'),
+    'earningsGrowth': ('growth', 'float32'),
+    'profitMargins': ('margin', 'float32'),
+    'marketCap': ('market_cap', 'float64'),
+    'dividendYield': ('dividend_yield', 'float32'),
+}
+
+FUNDAMENTALS_SCHEMA = dict({'name': 'label', 'sector': 'category', 'industry': 'category'},
+                           **{column: dtype for column, dtype in FUNDAMENTAL_FIELDS.values()})
+
+# Scan metrics joined onto the fundamentals for screening
+SCAN_COLUMNS = ['rsi', 'total_score', 'change_1w', 'change_1m']
+
+# ============================================================================
+# FUNDAMENTALS TABLE
+# ============================================================================
+
+def fetch_fundamentals(symbol):
+    """Fetch one symbol's fundamentals as a flat record (None if Yahoo has nothing)"""
+    import yfinance as yf
+    info = yf.Ticker(symbol).info
+    if not info or not (info.get('longName') or info.get('shortName')):
+        return None
+
+    record = {
+        'symbol': symbol,
+        'name': (info.get('longName') or info.get('shortName'))[:35],
+        'sector': info.get('sector'),
+        'industry': info.get('industry'),
+    }
+    for key, (column, _) in FUNDAMENTAL_FIELDS.items():
+        record[column] = info.get(key)
+    return record
+
+def build_fundamentals_table(records):
+    """Build the typed, symbol-indexed fundamentals table"""
+    if isinstance(records, MetricStore):
+        table = records.to_frame()
+    else:
+        records = list(records.values()) if isinstance(records, dict) else list(records)
+        table = pd.DataFrame(records, columns=['symbol'] + list(FUNDAMENTALS_SCHEMA)).set_index('symbol')
+
+    for col in ('sector', 'industry'):
+        table[col] = table[col].astype(object).fillna('Unknown').astype('category')
+    for column, dtype in FUNDAMENTAL_FIELDS.values():
+        # Yahoo reports 'Infinity' P/E for zero earnings; treat it as missing, like scanner.to_float
+        values = pd.to_numeric(table[column], errors='coerce').replace([np.inf, -np.inf], np.nan)
+        table[column] = values.astype(dtype)
+
+    return table
+
+def refresh_fundamentals(symbols, on_progress=None):
+    """Refetch fundamentals for the universe and persist the table.
+
+    Uses its own scan checkpoint, so an interrupted refresh resumes where
+    it stopped.
+    """
+    checkpoint = ScanCheckpoint(path=FUNDAMENTALS_CHECKPOINT, max_age_hours=FUNDAMENTALS_MAX_AGE_HOURS,
+                                schema=FUNDAMENTALS_SCHEMA)
+    if not checkpoint.is_resumable(symbols):
+        checkpoint.reset()
+    run_scan(checkpoint.pending_symbols(symbols), fetch_fundamentals, checkpoint, on_progress=on_progress)
+
+    table = build_fundamentals_table(checkpoint.results)
+    os.makedirs(SCAN_DIR, exist_ok=True)
+    table.to_pickle(FUNDAMENTALS_FILE)
+    return checkpoint
+
+# One background refresh per process, started when the table goes stale
+FUNDAMENTALS_RETRY_MINUTES = 15
+_refresh_state = {'thread': None, 'started': 0.0, 'completed': 0, 'total': 0, 'failures': {}}
+_refresh_lock = threading.Lock()
+
+def _background_refresh(get_symbols):
+    def on_progress(completed, _):
+        _refresh_state['completed'] = completed
+
+    try:
+        symbols = get_symbols()
+        _refresh_state['total'] = len(symbols)
+        checkpoint = refresh_fundamentals(symbols, on_progress=on_progress)
+        _refresh_state['failures'] = dict(checkpoint.failures)
+    except Exception as e:
+        print(f"⚠️ Fundamentals refresh failed: {e}")
+
+def start_background_refresh(get_symbols):
+    """Refresh the table in a background thread over get_symbols(); False if one is already running"""
+    with _refresh_lock:
+        running = _refresh_state['thread']
+        if running is not None and running.is_alive():
+            return False
+        thread = threading.Thread(target=_background_refresh, args=(get_symbols,),
+                                  name='fundamentals-refresh', daemon=True)
+        _refresh_state.update(thread=thread, started=time.time(), completed=0, total=0, failures={})
+        thread.start()
+    return True
+
+def refresh_if_stale(get_symbols):
+    """Start a background refresh when the table is missing or older than FUNDAMENTALS_MAX_AGE_HOURS.
+
+    A refresh that failed outright is retried after FUNDAMENTALS_RETRY_MINUTES.
+    """
+    if fundamentals_stale() and time.time() - _refresh_state['started'] > FUNDAMENTALS_RETRY_MINUTES * 60:
+        start_background_refresh(get_symbols)
+
+def refresh_progress():
+    """(completed, total) for the running background refresh, or None"""
+    running = _refresh_state['thread']
+    if running is None or not running.is_alive():
+        return None
+    return _refresh_state['completed'], _refresh_state['total']
+
+def refresh_failures():
+    """{symbol: error} from the last finished background refresh"""
+    return _refresh_state['failures']
+
+def fundamentals_updated():
+    """When the fundamentals table was last written, or None"""
+    if not os.path.exists(FUNDAMENTALS_FILE):
+        return None
+    return datetime.fromtimestamp(os.path.getmtime(FUNDAMENTALS_FILE))
+
+def fundamentals_stale():
+    updated = fundamentals_updated()
+    return updated is None or (datetime.now() - updated).total_seconds() > FUNDAMENTALS_MAX_AGE_HOURS * 3600
+
+_screen_table_cache = {}
+
+def _mtime(path):
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+def load_screen_table():
+    """Fundamentals joined with the latest scan metrics, cached until either file changes"""
+    key = (_mtime(FUNDAMENTALS_FILE), _mtime(CHECKPOINT_FILE))
+    if _screen_table_cache.get('key') == key:
+        return _screen_table_cache['table']
+
+    if key[0] is None:
+        table = build_fundamentals_table([])
+    else:
+        table = pd.read_pickle(FUNDAMENTALS_FILE)
+
+    if key[1] is not None:
+        metrics = build_metrics_table(ScanCheckpoint().results)
+        table = table.join(metrics[SCAN_COLUMNS], how='left')
+    else:
+        for col in SCAN_COLUMNS:
+            table[col] = np.float32(np.nan)
+
+    _screen_table_cache['key'] = key
+    _screen_table_cache['table'] = table
+    return table
+
+# ============================================================================
+# SCREENER
+# ============================================================================
+
+# Names accepted in screen expressions -> table column
+SCREEN_FIELDS = {
+    'pe': 'pe', 'p/e': 'pe',
+    'peg': 'peg',
+    'growth': 'growth', 'eps growth': 'growth', 'earnings growth': 'growth',
+    'margin': 'margin', 'margins': 'margin', 'profit margin': 'margin',
+    'mcap': 'market_cap', 'market cap': 'market_cap', 'marketcap': 'market_cap',
+    'yield': 'dividend_yield', 'div': 'dividend_yield', 'dividend yield': 'dividend_yield',
+    'rsi': 'rsi',
+    'score': 'total_score',
+    '1w': 'change_1w',
+    '1m': 'change_1m', 'momentum': 'change_1m',
+    'sector': 'sector',
+    'industry': 'industry',
+}
+
+# Stored as fractions, so "10%" means 0.10
+FRACTION_COLUMNS = {'growth', 'margin', 'dividend_yield'}
+TEXT_COLUMNS = {'sector', 'industry'}
+
+_OPERATORS = {
+    '<': operator.lt, '<=': operator.le,
+    '>': operator.gt, '>=': operator.ge,
+    '=': operator.eq, '==': operator.eq, '!=': operator.ne,
+}
+_MULTIPLIERS = {'': 1, 'k': 1e3, 'm': 1e6, 'b': 1e9, 't': 1e12}
+
+_SPLIT_RE = re.compile(r'\s+and\s+|\s*,\s*', re.IGNORECASE)
+_CLAUSE_RE = re.compile(r'^\s*([a-z0-9/ ]+?)\s*(<=|>=|==|!=|<|>|=)\s*(.+?)\s*$', re.IGNORECASE)
+_NUMBER_RE = re.compile(r'^([-+]?\d*\.?\d+)\s*([%kmbt]?)$', re.IGNORECASE)
+
+def parse_screen(expression):
+    """Parse e.g. "PE<15 and growth>10% and RSI<40" into (column, op, value) clauses.
+
+    Raises ValueError with a user-facing message on bad input.
+    """
+    clauses = []
+    for part in _SPLIT_RE.split(expression.strip()):
+        if not part:
+            continue
+        match = _CLAUSE_RE.match(part)
+        if not match:
+            raise ValueError(f"Can't read condition '{part}'")
+
+        name, op, raw = match.groups()
+        column = SCREEN_FIELDS.get(name.strip().lower())
+        if column is None:
+            raise ValueError(f"Unknown field '{name.strip()}'")
+
+        if column in TEXT_COLUMNS:
+            if op not in ('=', '==', '!='):
+                raise ValueError(f"'{name.strip()}' only supports = and !=")
+            clauses.append((column, op, raw.strip('\'" ')))
+            continue
+
+        number = _NUMBER_RE.match(raw)
+        if not number:
+            raise ValueError(f"'{raw}' is not a number")
+        value, suffix = float(number.group(1)), number.group(2).lower()
+        if suffix == '%':
+            if column in FRACTION_COLUMNS:
+                value /= 100
+        else:
+            value *= _MULTIPLIERS[suffix]
+        clauses.append((column, op, value))
+
+    return clauses
+
+def run_screen(table, expression, sort_by=None, ascending=False, limit=None):
+    """Filter and sort the screen table with vectorized column comparisons"""
+    mask = np.ones(len(table), dtype=bool)
+    for column, op, value in parse_screen(expression):
+        if column in TEXT_COLUMNS:
+            values = table[column].astype(str).str.lower().to_numpy()
+            mask &= _OPERATORS[op](values, value.lower())
+        else:
+            # Missing data never passes a numeric filter
+            values = table[column].to_numpy(dtype='float64')
+            mask &= _OPERATORS[op](values, value) & ~np.isnan(values)
+
+    result = table[mask]
+    if sort_by:
+        result = result.sort_values(sort_by, ascending=ascending, na_position='last')
+    if limit:
+        result = result.head(limit)
+    return result
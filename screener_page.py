@@ -0,0 +1,118 @@
+"""
+Screener Page - Custom filters over the cached fundamentals table
+Screens run locally against the cached table; only a refresh hits the network
+"""
+
+import time
+import streamlit as st
+from utils import get_all_symbols
+from screener import (load_screen_table, run_screen, fundamentals_updated, fundamentals_stale,
+                      refresh_if_stale, start_background_refresh, refresh_progress, refresh_failures,
+                      FUNDAMENTALS_MAX_AGE_HOURS)
+
+# How often the page checks on a running background refresh
+REFRESH_POLL_SECONDS = 3
+
+class ScreenerPage:
+    def __init__(self):
+        """Initialize screener page"""
+        if 'screen_expression' not in st.session_state:
+            st.session_state.screen_expression = "PE<15 and growth>10% and RSI<40"
+
+    def create_content(self):
+        """Create screener page"""
+        st.title("🧮 Stock Screener")
+        st.caption("Filter the whole universe by fundamentals and scan metrics")
+
+        st.markdown("---")
+
+        # Missing or stale tables refresh themselves in the background
+        refresh_if_stale(get_all_symbols)
+
+        updated = fundamentals_updated()
+        if updated is None:
+            st.info("📥 No fundamentals cached yet. Downloading them in the background (~2-3 minutes).")
+        elif fundamentals_stale():
+            st.warning(f"⏳ Fundamentals are from {updated:%b %d, %H:%M}. A background refresh will update them.")
+        else:
+            st.caption(f"Fundamentals updated {updated:%b %d, %H:%M} • refreshed every {FUNDAMENTALS_MAX_AGE_HOURS}h")
+
+        if st.button("🔄 Refresh Fundamentals", key="refresh_fundamentals"):
+            start_background_refresh(get_all_symbols)
+        self.refresh_status()
+
+        table = load_screen_table()
+        if table.empty:
+            return
+
+        # Screen inputs
+        expression = st.text_input("Screen:", key="screen_expression",
+                                   placeholder="e.g., PE<15 and growth>10% and RSI<40")
+
+        sort_col1, sort_col2 = st.columns([3, 1])
+        with sort_col1:
+            sort_by = st.selectbox("Sort by", ['total_score', 'pe', 'peg', 'growth', 'margin',
+                                               'market_cap', 'dividend_yield', 'rsi', 'change_1m'],
+                                   key="screen_sort")
+        with sort_col2:
+            ascending = st.toggle("Ascending", value=False, key="screen_asc")
+
+        with st.expander("ℹ️ Screen syntax"):
+            st.markdown("""
+                Join conditions with **and** (or commas). Each condition is `field op value`
+                with `<`, `<=`, `>`, `>=`, `=` or `!=`.
+
+                - **Fundamentals:** `pe`, `peg`, `growth`, `margin`, `yield`, `mcap`
+                - **Scan metrics:** `rsi`, `score`, `1w`, `1m` (from the last Top Performers scan)
+                - **Labels:** `sector=Technology`, `industry!=Banks - Regional`
+
+                Percentages work on growth, margin and yield (`growth>10%`);
+                market cap takes K/M/B/T suffixes (`mcap>10B`).
+            """)
+
+        try:
+            start = time.perf_counter()
+            results = run_screen(table, expression, sort_by=sort_by, ascending=ascending)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            return
+
+        st.success(f"✅ {len(results)} of {len(table)} stocks match • screened in {elapsed_ms:.1f} ms")
+
+        display = results.copy()
+        for col in ('growth', 'margin', 'dividend_yield'):
+            display[col] = display[col] * 100
+        display['market_cap'] = display['market_cap'] / 1e9
+        st.dataframe(
+            display.round(2).rename(columns={
+                'name': 'Name', 'sector': 'Sector', 'industry': 'Industry',
+                'pe': 'P/E', 'peg': 'PEG', 'growth': 'Growth %', 'margin': 'Margin %',
+                'market_cap': 'Mkt Cap ($B)', 'dividend_yield': 'Yield %',
+                'rsi': 'RSI', 'total_score': 'Score', 'change_1w': '1W %', 'change_1m': '1M %',
+            }),
+            use_container_width=True
+        )
+
+    def refresh_status(self):
+        """Live progress while a background refresh runs, else failures from the last one"""
+        if refresh_progress() is not None:
+            self.refresh_progress_panel()
+            return
+
+        failures = refresh_failures()
+        if failures:
+            with st.expander(f"⚠️ {len(failures)} stocks failed to load"):
+                for symbol, error in sorted(failures.items()):
+                    st.caption(f"• **{symbol}**: {error}")
+
+    @st.fragment(run_every=REFRESH_POLL_SECONDS)
+    def refresh_progress_panel(self):
+        """Polls the running refresh; reruns the page with the new table once it finishes"""
+        progress = refresh_progress()
+        if progress is None:
+            st.rerun()
+
+        completed, total = progress
+        st.progress(completed / total if total else 0.0,
+                    text=f"🔄 Refreshing fundamentals in the background: {completed}/{total} stocks")
@@ -0,0 +1,40 @@
+"""
+Startup Timing for SharkFin
+Process start, on-demand page import times and first render, kept for the process lifetime
+"""
+
+import sys
+import time
+import importlib
+
+# Imported first thing by main.py, so this is roughly when the app started
+PROCESS_START = time.perf_counter()
+
+import_seconds = {}
+render_seconds = {}
+
+def load_page(module_name, class_name):
+    """Page class from its module, importing (and timing) the module on first use"""
+    if module_name not in sys.modules:
+        start = time.perf_counter()
+        importlib.import_module(module_name)
+        import_seconds[module_name] = time.perf_counter() - start
+        print(f"⏱️ Imported {module_name} in {import_seconds[module_name]:.2f}s")
+    return getattr(sys.modules[module_name], class_name)
+
+def mark_rendered(page):
+    """Record how long after process start a page first finished rendering"""
+    if page not in render_seconds:
+        render_seconds[page] = time.perf_counter() - PROCESS_START
+        if len(render_seconds) == 1:
+            print(f"⏱️ First page ({page}) rendered {render_seconds[page]:.2f}s after start")
+
+def startup_report():
+    """Lines describing cold-start cost: first render and per-page import times"""
+    lines = []
+    if render_seconds:
+        page, seconds = next(iter(render_seconds.items()))
+        lines.append(f"First render ({page}): {seconds:.2f}s after start")
+    for module_name, seconds in import_seconds.items():
+        lines.append(f"{module_name}: imported in {seconds:.2f}s")
+    return lines
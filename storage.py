@@ -0,0 +1,312 @@
+"""
+Storage for SharkFin
+SQLite ledger for lots, transactions and watchlists, served per user from a
+pooled, cached portfolio service
+"""
+
+import os
+import re
+import json
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+DB_FILE = 'sharkfin.db'
+DEFAULT_USER = 'default'
+POOL_SIZE = 5
+POOL_TIMEOUT_SECONDS = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lots (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id     TEXT    NOT NULL,
+    symbol      TEXT    NOT NULL,
+    shares      REAL    NOT NULL,
+    buy_price   REAL    NOT NULL,
+    buy_date    TEXT,
+    created_at  TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lots_user_symbol ON lots (user_id, symbol);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id     TEXT    NOT NULL,
+    lot_id      INTEGER,
+    action      TEXT    NOT NULL,
+    symbol      TEXT    NOT NULL,
+    shares      REAL    NOT NULL,
+    price       REAL    NOT NULL,
+    created_at  TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_symbol ON transactions (user_id, symbol);
+
+CREATE TABLE IF NOT EXISTS watchlist (
+    user_id     TEXT    NOT NULL,
+    symbol      TEXT    NOT NULL,
+    added_at    TEXT    NOT NULL,
+    PRIMARY KEY (user_id, symbol)
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key         TEXT PRIMARY KEY,
+    value       TEXT
+);
+"""
+
+# Fixed statement text, so each pooled connection compiles a query once and
+# reuses it from sqlite3's statement cache afterwards
+QUERIES = {
+    'select_lots': "SELECT id, symbol, shares, buy_price, buy_date FROM lots WHERE user_id = ? ORDER BY id",
+    'select_lot': "SELECT symbol, shares, buy_price FROM lots WHERE id = ? AND user_id = ?",
+    'insert_lot': "INSERT INTO lots (user_id, symbol, shares, buy_price, buy_date, created_at) "
+                  "VALUES (?, ?, ?, ?, ?, ?)",
+    'delete_lot': "DELETE FROM lots WHERE id = ? AND user_id = ?",
+    'insert_transaction': "INSERT INTO transactions (user_id, lot_id, action, symbol, shares, price, created_at) "
+                          "VALUES (?, ?, ?, ?, ?, ?, ?)",
+    'select_watchlist': "SELECT symbol FROM watchlist WHERE user_id = ? ORDER BY added_at",
+    'insert_watch': "INSERT OR IGNORE INTO watchlist (user_id, symbol, added_at) VALUES (?, ?, ?)",
+    'delete_watch': "DELETE FROM watchlist WHERE user_id = ? AND symbol = ?",
+    'insert_meta': "INSERT INTO meta (key, value) VALUES (?, ?)",
+}
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shared by all sessions.
+
+    Connections are opened lazily up to `size`; callers beyond that wait
+    for one to be returned.
+    """
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=POOL_TIMEOUT_SECONDS, check_same_thread=False,
+                               cached_statements=len(QUERIES) * 2)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._open()
+                except Exception:
+                    self._opened -= 1
+                    raise
+        return self._idle.get(timeout=POOL_TIMEOUT_SECONDS)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; the block runs as one transaction"""
+        conn = self._acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._idle.put(conn)
+
+class LedgerStore:
+    """Transactional store for portfolio lots, their transactions and watchlists.
+
+    Every change is a small insert or delete inside its own transaction, so
+    concurrent sessions never overwrite each other's edits. WAL mode lets
+    readers proceed while a write is in progress.
+    """
+
+    def __init__(self, path=DB_FILE, pool_size=POOL_SIZE):
+        self.path = path
+        self.pool = ConnectionPool(path, pool_size)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return self.pool.connection()
+
+    # ------------------------------------------------------------------
+    # Lots
+    # ------------------------------------------------------------------
+
+    def load_portfolio(self, user_id=DEFAULT_USER):
+        """All lots for a user as position dicts (with their ledger id)"""
+        with self._connect() as conn:
+            rows = conn.execute(QUERIES['select_lots'], (user_id,)).fetchall()
+        return [_lot_dict(row) for row in rows]
+
+    def add_lot(self, user_id, symbol, shares, buy_price, buy_date=None):
+        """Insert a lot and its buy transaction; returns the new position dict"""
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            cursor = conn.execute(QUERIES['insert_lot'], (user_id, symbol, shares, buy_price, buy_date, now))
+            lot_id = cursor.lastrowid
+            conn.execute(QUERIES['insert_transaction'], (user_id, lot_id, 'buy', symbol, shares, buy_price, now))
+        position = {'id': lot_id, 'symbol': symbol, 'shares': shares, 'buy_price': buy_price}
+        if buy_date:
+            position['buy_date'] = buy_date
+        return position
+
+    def delete_lot(self, user_id, lot_id):
+        """Remove a lot, recording a 'remove' transaction; returns False if it was already gone"""
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            row = conn.execute(QUERIES['select_lot'], (lot_id, user_id)).fetchone()
+            if row is None:
+                return False
+            conn.execute(QUERIES['delete_lot'], (lot_id, user_id))
+            conn.execute(QUERIES['insert_transaction'],
+                         (user_id, lot_id, 'remove', row['symbol'], row['shares'], row['buy_price'], now))
+        return True
+
+    # ------------------------------------------------------------------
+    # Watchlist
+    # ------------------------------------------------------------------
+
+    def load_watchlist(self, user_id=DEFAULT_USER):
+        with self._connect() as conn:
+            rows = conn.execute(QUERIES['select_watchlist'], (user_id,)).fetchall()
+        return [row['symbol'] for row in rows]
+
+    def add_watch(self, user_id, symbol):
+        with self._connect() as conn:
+            conn.execute(QUERIES['insert_watch'], (user_id, symbol, datetime.now().isoformat()))
+
+    def remove_watch(self, user_id, symbol):
+        with self._connect() as conn:
+            conn.execute(QUERIES['delete_watch'], (user_id, symbol))
+
+    # ------------------------------------------------------------------
+    # Migration
+    # ------------------------------------------------------------------
+
+    def import_json(self, user_id=DEFAULT_USER, portfolio_path='portfolio.json',
+                    watchlist_path='watchlist.json'):
+        """One-time import of the legacy JSON files into the ledger"""
+        # The meta row doubles as a lock so concurrent first sessions import once
+        try:
+            with self._connect() as conn:
+                conn.execute(QUERIES['insert_meta'], ('json_imported', datetime.now().isoformat()))
+        except sqlite3.IntegrityError:
+            return
+
+        for pos in _read_json_list(portfolio_path):
+            try:
+                self.add_lot(user_id, pos['symbol'], float(pos['shares']), float(pos['buy_price']),
+                             pos.get('buy_date'))
+            except (KeyError, TypeError, ValueError):
+                continue
+        for symbol in _read_json_list(watchlist_path):
+            if isinstance(symbol, str):
+                self.add_watch(user_id, symbol)
+
+# ============================================================================
+# PORTFOLIO SERVICE
+# ============================================================================
+
+class PortfolioService:
+    """Per-user portfolio and watchlist API over the ledger.
+
+    Reads go through an in-memory cache per user so reruns don't touch the
+    database; every write goes to the ledger first and then drops that
+    user's cache entry.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._cache = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, user_id, kind, load):
+        with self._lock:
+            entry = self._cache.get(user_id, {})
+            if kind in entry:
+                return list(entry[kind])
+            version = self._versions.get(user_id, 0)
+        value = load(user_id)
+        with self._lock:
+            # A write that landed during the load makes this read stale
+            if self._versions.get(user_id, 0) == version:
+                self._cache.setdefault(user_id, {})[kind] = value
+        return list(value)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._cache.pop(user_id, None)
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def get_portfolio(self, user_id):
+        return self._cached(user_id, 'portfolio', self.store.load_portfolio)
+
+    def get_watchlist(self, user_id):
+        return self._cached(user_id, 'watchlist', self.store.load_watchlist)
+
+    def add_position(self, user_id, symbol, shares, buy_price, buy_date=None):
+        try:
+            return self.store.add_lot(user_id, symbol, shares, buy_price, buy_date)
+        finally:
+            self.invalidate(user_id)
+
+    def remove_position(self, user_id, lot_id):
+        try:
+            return self.store.delete_lot(user_id, lot_id)
+        finally:
+            self.invalidate(user_id)
+
+    def add_to_watchlist(self, user_id, symbol):
+        try:
+            self.store.add_watch(user_id, symbol)
+        finally:
+            self.invalidate(user_id)
+
+    def remove_from_watchlist(self, user_id, symbol):
+        try:
+            self.store.remove_watch(user_id, symbol)
+        finally:
+            self.invalidate(user_id)
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_portfolio_service():
+    """Process-wide portfolio service shared by every session"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            store = LedgerStore()
+            # Legacy JSON files belonged to the single shared portfolio
+            store.import_json(DEFAULT_USER)
+            _service = PortfolioService(store)
+    return _service
+
+def normalize_user(name):
+    """Canonical user id from a free-text name (blank -> DEFAULT_USER)"""
+    user_id = re.sub(r'[^a-z0-9_.@-]', '', (name or '').strip().lower())
+    return user_id or DEFAULT_USER
+
+def _lot_dict(row):
+    position = {'id': row['id'], 'symbol': row['symbol'], 'shares': row['shares'], 'buy_price': row['buy_price']}
+    if row['buy_date']:
+        position['buy_date'] = row['buy_date']
+    return position
+
+def _read_json_list(path):
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+    except (OSError, ValueError):
+        return []
@@ -7,8 +7,14 @@ import streamlit as st
 import yfinance as yf
 import numpy as np
 from utils import get_all_symbols, calculate_rsi
+from scanner import (ScanCheckpoint, run_scan, build_metrics_table, group_summary, group_members,
+                     score_stock, explain_stock, to_float, try_begin_scan, end_scan, scan_in_progress)
+from scan_history import save_snapshot, find_snapshot, diff_rankings, change_feed, change_feed_json, EVENTS
 from datetime import datetime
-import concurrent.futures
+
+# How often a session following another session's scan checks its progress
+SCAN_POLL_SECONDS = 5
+
 def create_content(self):
     # Force sidebar visible on non-home pages
     st.sidebar.markdown("")  # This forces sidebar to stay open
@@ -23,24 +29,52 @@ class TopPerformersPage:
         """Create top performers page"""
         st.title("🏆 Top Performers")
         st.markdown("### 🤖 AI-Powered Market Analysis")
-        st.caption("Comprehensive analysis across S&P 500 + NASDAQ-100 using ML, technicals, and fundamentals")
+        st.caption("Comprehensive analysis across the configured universe using ML, technicals, and fundamentals")
         
         st.markdown("---")
         
+        checkpoint = ScanCheckpoint()
+        all_symbols = get_all_symbols()
+        
         # Info box
-        st.info("⚠️ **Full market scan** analyzes 650+ stocks using 3 scoring models. Takes ~2-3 minutes.")
+        st.info(f"⚠️ **Full market scan** analyzes {len(all_symbols):,} stocks using 3 scoring models. "
+                f"Takes ~2-3 minutes per 650 stocks.")
         
         st.markdown("---")
         
+        # Another session's scan owns the checkpoint file; follow it instead
+        if scan_in_progress():
+            self.display_running_scan(len(all_symbols))
+            return
+        
+        # Interrupted scans resume instead of starting over
+        resumable = checkpoint.is_resumable(all_symbols)
+        if resumable and (checkpoint.results or checkpoint.failures):
+            remaining = len(checkpoint.unattempted_symbols(all_symbols))
+            st.warning(f"⏸️ Previous scan was interrupted: {len(checkpoint.results)} stocks done, "
+                       f"{remaining} remaining. Running the analysis will resume it.")
+            if st.button("🗑️ Discard and Start Fresh", key="scan_reset"):
+                if try_begin_scan():
+                    try:
+                        checkpoint.reset()
+                    finally:
+                        end_scan()
+                st.rerun()
+        
         # Run analysis button
         if st.button("🔄 Run Full Market Analysis", use_container_width=True, type="primary"):
-            self.run_analysis()
+            self.run_analysis(checkpoint, all_symbols)
+        elif checkpoint.failures and st.button("🔁 Retry Failed Stocks", use_container_width=True):
+            self.run_analysis(checkpoint, list(checkpoint.failures), retry=True)
+        elif checkpoint.results:
+            st.caption(f"Last scan started {checkpoint.started:%b %d, %H:%M}")
+            self.display_results(checkpoint)
         else:
             # Welcome screen
             st.markdown("""
                 <div style='text-align: center; padding: 50px; color: #888;'>
                     <h3>Ready to analyze the entire market</h3>
-                    <p>Our AI will scan 650+ stocks and identify:</p>
+                    <p>Our AI will scan the whole configured universe and identify:</p>
                     <ul style='text-align: left; display: inline-block;'>
                         <li><strong>Top 5 BUY recommendations</strong> - Best opportunities</li>
                         <li><strong>Top 5 SELL warnings</strong> - Stocks to avoid</li>
@@ -56,184 +90,242 @@ class TopPerformersPage:
             """, unsafe_allow_html=True)
     
     def analyze_stock_fast(self, symbol):
-        """Fast analysis for single stock - optimized"""
-        try:
-            ticker = yf.Ticker(symbol)
-            
-            # Get only what we need - faster
-            hist = ticker.history(period="3mo")
-            if hist.empty or len(hist) < 20:
-                return None
-            
-            info = ticker.info
-            prices = hist['Close'].tolist()
-            volumes = hist['Volume'].tolist()
-            current_price = prices[-1]
-            
-            # TECHNICAL SCORE
-            rsi = calculate_rsi(prices)
-            ma_20 = sum(prices[-20:]) / 20
-            ma_50 = sum(prices[-50:]) / 50 if len(prices) >= 50 else ma_20
-            
-            tech_score = 0
-            tech_reasons = []
-            
-            if rsi < 30:
-                tech_score += 3
-                tech_reasons.append("RSI oversold (<30)")
-            elif rsi < 40:
-                tech_score += 2
-                tech_reasons.append("RSI below 40")
-            elif rsi > 70:
-                tech_score -= 3
-                tech_reasons.append("RSI overbought (>70)")
-            elif rsi > 60:
-                tech_score -= 2
-                tech_reasons.append("RSI above 60")
-            
-            if current_price > ma_20 > ma_50:
-                tech_score += 2
-                tech_reasons.append("Bullish MA trend")
-            elif current_price > ma_20:
-                tech_score += 1
-                tech_reasons.append("Above MA(20)")
-            elif current_price < ma_20:
-                tech_score -= 1
-                tech_reasons.append("Below MA(20)")
-            
-            # Volume check
-            avg_vol = sum(volumes[-10:]) / 10 if len(volumes) >= 10 else volumes[-1]
-            if volumes[-1] > avg_vol * 1.5:
-                tech_score += 1
-                tech_reasons.append("High volume")
-            
-            # FUNDAMENTAL SCORE
-            pe = info.get('trailingPE', 0)
-            eps_growth = info.get('earningsGrowth', 0)
-            profit_margin = info.get('profitMargins', 0)
-            
-            fund_score = 0
-            fund_reasons = []
-            
-            if pe and 0 < pe < 15:
-                fund_score += 2
-                fund_reasons.append(f"Low P/E ({pe:.1f})")
-            elif pe and 15 <= pe < 25:
-                fund_score += 1
-                fund_reasons.append(f"Fair P/E ({pe:.1f})")
-            elif pe and pe > 35:
-                fund_score -= 2
-                fund_reasons.append(f"High P/E ({pe:.1f})")
-            
-            if eps_growth and eps_growth > 0.15:
-                fund_score += 2
-                fund_reasons.append(f"Strong growth ({eps_growth*100:.0f}%)")
-            elif eps_growth and eps_growth > 0.05:
-                fund_score += 1
-                fund_reasons.append(f"Positive growth ({eps_growth*100:.0f}%)")
-            elif eps_growth and eps_growth < -0.1:
-                fund_score -= 2
-                fund_reasons.append(f"Declining earnings ({eps_growth*100:.0f}%)")
-            
-            if profit_margin and profit_margin > 0.15:
-                fund_score += 1
-                fund_reasons.append(f"High margins ({profit_margin*100:.0f}%)")
-            
-            # ML MOMENTUM SCORE
-            week_change = ((prices[-1] - prices[-5]) / prices[-5]) if len(prices) >= 5 else 0
-            month_change = ((prices[-1] - prices[-20]) / prices[-20]) if len(prices) >= 20 else 0
-            
-            ml_score = 0
-            ml_reasons = []
-            
-            if month_change > 0.15:
-                ml_score += 3
-                ml_reasons.append(f"Strong 1M momentum (+{month_change*100:.0f}%)")
-            elif month_change > 0.05:
-                ml_score += 1
-                ml_reasons.append(f"Positive 1M trend (+{month_change*100:.0f}%)")
-            elif month_change < -0.15:
-                ml_score -= 3
-                ml_reasons.append(f"Weak 1M momentum ({month_change*100:.0f}%)")
-            elif month_change < -0.05:
-                ml_score -= 1
-                ml_reasons.append(f"Negative 1M trend ({month_change*100:.0f}%)")
-            
-            if week_change > 0.05:
-                ml_score += 1
-                ml_reasons.append(f"Weekly momentum (+{week_change*100:.0f}%)")
-            elif week_change < -0.05:
-                ml_score -= 1
-                ml_reasons.append(f"Weekly decline ({week_change*100:.0f}%)")
-            
-            # TOTAL SCORE
-            total_score = tech_score + fund_score + ml_score
-            
-            return {
-                'symbol': symbol,
-                'name': info.get('longName', symbol)[:35],
-                'price': current_price,
-                'tech_score': tech_score,
-                'fund_score': fund_score,
-                'ml_score': ml_score,
-                'total_score': total_score,
-                'rsi': rsi,
-                'pe': pe if pe else 0,
-                'change_1w': week_change * 100,
-                'change_1m': month_change * 100,
-                'tech_reasons': tech_reasons[:3],
-                'fund_reasons': fund_reasons[:2],
-                'ml_reasons': ml_reasons[:2]
-            }
-        
-        except:
+        """Fast analysis for single stock - optimized
+        
+        Returns None when there is too little history to score; fetch errors
+        propagate so the scanner can retry them and report the reason.
+        """
+        ticker = yf.Ticker(symbol)
+        
+        # Get only what we need - faster
+        hist = ticker.history(period="3mo")
+        if hist.empty or len(hist) < 20:
             return None
+        
+        info = ticker.info
+        prices = hist['Close'].tolist()
+        volumes = hist['Volume'].tolist()
+        current_price = prices[-1]
+        
+        # Volume check
+        avg_vol = sum(volumes[-10:]) / 10 if len(volumes) >= 10 else volumes[-1]
+        
+        # Only numbers are kept; reason text is regenerated for display
+        metrics = {
+            'symbol': symbol,
+            'name': (info.get('longName') or symbol)[:35],
+            'sector': info.get('sector'),
+            'industry': info.get('industry'),
+            'price': current_price,
+            'rsi': calculate_rsi(prices),
+            'ma_20': sum(prices[-20:]) / 20,
+            'ma_50': sum(prices[-50:]) / 50 if len(prices) >= 50 else sum(prices[-20:]) / 20,
+            'volume_ratio': volumes[-1] / avg_vol if avg_vol else 0.0,
+            'pe': to_float(info.get('trailingPE')),
+            'growth': to_float(info.get('earningsGrowth')),
+            'margin': to_float(info.get('profitMargins')),
+            'change_1w': ((prices[-1] - prices[-5]) / prices[-5] * 100) if len(prices) >= 5 else 0.0,
+            'change_1m': ((prices[-1] - prices[-20]) / prices[-20] * 100) if len(prices) >= 20 else 0.0,
+        }
+        
+        # TECHNICAL + FUNDAMENTAL + ML MOMENTUM SCORES
+        tech_score, fund_score, ml_score = score_stock(metrics)
+        metrics['tech_score'] = tech_score
+        metrics['fund_score'] = fund_score
+        metrics['ml_score'] = ml_score
+        metrics['total_score'] = tech_score + fund_score + ml_score
+        
+        return metrics
     
-    def run_analysis(self):
-        """Run full market analysis with parallel processing"""
-        all_symbols = get_all_symbols()
+    @st.fragment(run_every=SCAN_POLL_SECONDS)
+    def display_running_scan(self, total):
+        """Progress of a scan started by another session, polled until it ends"""
+        if not scan_in_progress():
+            st.rerun()
+        
+        checkpoint = ScanCheckpoint()
+        done = len(checkpoint.results) + len(checkpoint.skipped) + len(checkpoint.failures)
+        st.info(f"⏳ A market scan is already running in another session: {done:,}/{total:,} stocks analyzed. "
+                f"Results will show here when it finishes.")
+        st.progress(min(done / total, 1.0) if total else 0.0)
+    
+    def run_analysis(self, checkpoint, symbols, retry=False):
+        """Run (or resume) the market scan with parallel processing.
+        
+        A full run resumes a recent interrupted scan or starts a new one;
+        retry=True rescans just `symbols` (the failures) within the current scan.
+        """
+        if not try_begin_scan():
+            self.display_running_scan(len(get_all_symbols()))
+            return
+        try:
+            # Another session may have written the checkpoint since this page loaded
+            checkpoint.load()
+            if not retry and not checkpoint.is_resumable(symbols):
+                checkpoint.reset()
+            self._run_scan(checkpoint, symbols, retry)
+        finally:
+            end_scan()
+        
+        self.display_results(checkpoint)
+    
+    def _run_scan(self, checkpoint, symbols, retry):
+        pending = list(symbols) if retry else checkpoint.unattempted_symbols(symbols)
+        already_done = len(symbols) - len(pending)
+        total = len(symbols)
         
         st.markdown("### 🔄 Analysis in Progress")
-        progress_bar = st.progress(0)
+        if already_done:
+            st.caption(f"Resuming: {already_done} stocks restored from checkpoint")
+        progress_bar = st.progress(already_done / total if total else 0)
         status_text = st.empty()
         
-        results = []
-        total = len(all_symbols)
-        
-        # PARALLEL PROCESSING for speed
-        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-            future_to_symbol = {executor.submit(self.analyze_stock_fast, symbol): symbol 
-                               for symbol in all_symbols}
-            
-            completed = 0
-            for future in concurrent.futures.as_completed(future_to_symbol):
-                result = future.result()
-                if result:
-                    results.append(result)
-                
-                completed += 1
-                progress = completed / total
-                progress_bar.progress(progress)
-                status_text.text(f"Analyzed {completed}/{total} stocks ({progress*100:.0f}%)")
+        def on_progress(completed, _):
+            done = already_done + completed
+            progress = done / total
+            progress_bar.progress(progress)
+            status_text.text(f"Analyzed {done}/{total} stocks ({progress*100:.0f}%)")
+        
+        # PARALLEL PROCESSING for speed, each outcome checkpointed to disk
+        run_scan(pending, self.analyze_stock_fast, checkpoint, on_progress=on_progress)
         
         progress_bar.empty()
         status_text.empty()
         
+        # Finished scans are kept for scan-to-scan comparisons. A scan is finished once
+        # every symbol in the universe has an outcome, failures included; a later
+        # retry of the failures re-saves (overwrites) the same snapshot
+        if checkpoint.is_complete(get_all_symbols()):
+            save_snapshot(self.get_metrics_table(checkpoint), checkpoint.started)
+    
+    def display_results(self, checkpoint):
+        """Display buy/sell recommendations from a (possibly partial) scan"""
+        results = checkpoint.results
+        
+        if checkpoint.failures:
+            with st.expander(f"⚠️ {len(checkpoint.failures)} stocks failed to load"):
+                for symbol, error in sorted(checkpoint.failures.items()):
+                    st.caption(f"• **{symbol}**: {error}")
+        
         if not results:
             st.error("❌ No stocks could be analyzed")
             return
         
-        # Sort by score
-        results_sorted = sorted(results, key=lambda x: x['total_score'], reverse=True)
+        st.success(f"✅ **Analysis Complete!** Analyzed {len(results)} stocks")
         
-        # Get top buys and sells
-        top_buys = [r for r in results_sorted if r['total_score'] > 0][:5]
-        top_sells = [r for r in results_sorted if r['total_score'] < 0][-5:]
-        top_sells.reverse()
+        table = self.get_metrics_table(checkpoint)
         
-        st.success(f"✅ **Analysis Complete!** Analyzed {len(results)} stocks")
+        tab_picks, tab_sectors, tab_changes = st.tabs(["🏆 Top Picks", "🏭 Sectors", "🔀 Changes"])
+        with tab_picks:
+            self.display_top_picks(table, results)
+        with tab_sectors:
+            self.display_sector_view(table)
+        with tab_changes:
+            self.display_changes(table, checkpoint.started)
         
+        # Disclaimer
         st.markdown("---")
+        st.warning("""
+            ⚠️ **DISCLAIMER**: These recommendations are generated by AI for educational purposes only. 
+            This is NOT financial advice. Always conduct your own research and consult with a qualified 
+            financial advisor before making investment decisions. Past performance does not guarantee future results.
+        """)
+    
+    def get_metrics_table(self, checkpoint):
+        """Per-symbol metrics table for the current scan, cached in the session"""
+        key = (checkpoint.started, len(checkpoint.results))
+        cached = st.session_state.get('scan_metrics_table')
+        if cached is None or cached[0] != key:
+            cached = (key, build_metrics_table(checkpoint.results))
+            st.session_state.scan_metrics_table = cached
+        return cached[1]
+    
+    def display_sector_view(self, table):
+        """Sector leaderboard with industry and stock drill-downs"""
+        st.markdown("### 🏭 Sector Strength")
+        st.caption("Breadth = share of stocks with a positive score • Dispersion = spread of 1M returns")
+        
+        sectors = group_summary(table, by='sector')
+        st.dataframe(self.format_summary(sectors), use_container_width=True)
+        
+        selected = st.selectbox("Drill down into sector:", list(sectors.index), key="sector_drill")
+        if not selected:
+            return
+        
+        members = group_members(table, selected, by='sector')
+        
+        st.markdown(f"#### {selected} by Industry")
+        industries = group_summary(members, by='industry')
+        st.dataframe(self.format_summary(industries), use_container_width=True)
+        
+        st.markdown(f"#### {selected} Stocks")
+        st.dataframe(
+            members[['name', 'industry', 'price', 'total_score', 'rsi', 'change_1w', 'change_1m']]
+            .round(2),
+            use_container_width=True
+        )
+    
+    def display_changes(self, table, scan_time):
+        """Change feed against the previous scan or one from N days ago"""
+        st.markdown("### 🔀 What Changed")
+        
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            compare = st.radio("Compare with", ["Previous scan", "N days ago"],
+                               horizontal=True, key="diff_mode")
+        with col2:
+            days = st.number_input("Days", min_value=1, max_value=90, value=7,
+                                   key="diff_days", disabled=compare == "Previous scan")
+        
+        found = find_snapshot(scan_time, days_ago=0 if compare == "Previous scan" else days)
+        if found is None:
+            st.info("No earlier scan stored yet. Changes appear after your next full scan.")
+            return
+        
+        previous_time, previous = found
+        feed = change_feed(diff_rankings(table, previous))
+        
+        st.caption(f"Comparing with scan from {previous_time:%b %d, %H:%M} • {len(feed)} changes")
+        
+        if not feed:
+            st.info("No notable changes")
+        for change in feed:
+            rank = f"#{change['rank_prev']} → #{change['rank']}" if change['rank_prev'] else f"#{change['rank']}"
+            score = (f"{change['score_prev']:+d} → {change['score']:+d}" if change['score_prev'] is not None
+                     else f"{change['score']:+d}")
+            st.markdown(f"{EVENTS[change['event']]}: **{change['symbol']}** {change['name']} • "
+                        f"rank {rank} • score {score}")
+        
+        st.download_button("⬇️ Download JSON", change_feed_json(feed, scan_time, previous_time),
+                           file_name=f"sharkfin_changes_{scan_time:%Y%m%d}.json",
+                           mime="application/json", key="diff_json")
+    
+    def format_summary(self, summary):
+        """Round and relabel a group summary for display"""
+        display = summary.copy()
+        display['breadth'] = (display['breadth'] * 100).round(0)
+        display['advancers'] = (display['advancers'] * 100).round(0)
+        display = display.round(2)
+        return display.rename(columns={
+            'stocks': 'Stocks',
+            'mean_score': 'Avg Score',
+            'breadth': 'Breadth %',
+            'advancers': 'Up 1M %',
+            'momentum_1m': 'Avg 1M %',
+            'momentum_dispersion': '1M Dispersion',
+            'top_names': 'Top Names',
+        })
+    
+    def display_top_picks(self, table, results):
+        """Display top 5 buys and top 5 sells"""
+        # Sort by score
+        ranked = table.sort_values('total_score', ascending=False, kind='stable')
+        
+        # Get top buys and sells; reasons are only generated for these ten
+        buy_symbols = ranked.index[ranked['total_score'] > 0][:5]
+        sell_symbols = ranked.index[ranked['total_score'] < 0][-5:][::-1]
+        top_buys = [dict(results[s], **explain_stock(results[s])) for s in buy_symbols]
+        top_sells = [dict(results[s], **explain_stock(results[s])) for s in sell_symbols]
         
         # DISPLAY RESULTS - 1 COLUMN LAYOUT
         
@@ -354,11 +446,3 @@ class TopPerformersPage:
                 st.markdown("---")
         else:
             st.info("No strong sell signals detected")
-        
-        # Disclaimer
-        st.markdown("---")
-        st.warning("""
-            ⚠️ **DISCLAIMER**: These recommendations are generated by AI for educational purposes only. 
-            This is NOT financial advice. Always conduct your own research and consult with a qualified 
-            financial advisor before making investment decisions. Past performance does not guarantee future results.
-        """)
@@ -3,27 +3,42 @@ Utility Functions for SharkFin
 All helper functions, indicators, charting, news, etc.
 """
 
-import yfinance as yf
+import os
+import re
+import json
+import base64
+import time
+import zlib
+import threading
+from collections import OrderedDict, Counter
+from functools import lru_cache
 import pandas as pd
 import numpy as np
-import feedparser
 from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO, BytesIO
 import requests
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from http_cache import fetch_parsed
+from news_index import article_index, EntityTagger
+from screener import FUNDAMENTALS_FILE
+from scan_history import list_snapshots
 
 # ============================================================================
 # STOCK SYMBOL MANAGEMENT
 # ============================================================================
 
+def read_html_tables(body):
+    return pd.read_html(StringIO(body.decode('utf-8', errors='replace')), header=0)
+
+def read_pipe_table(body):
+    return pd.read_csv(BytesIO(body), sep='|', dtype=str)
+
 def get_sp500_symbols():
     """Get S&P 500 symbols from Wikipedia with fallback"""
     try:
         url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
-        headers = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'}
-        tables = pd.read_html(url, header=0, storage_options={'User-Agent': headers['User-Agent']})
+        tables = fetch_parsed(url, read_html_tables)
         df = tables[0]
         symbols = df['Symbol'].tolist()
         symbols = [s.replace('.', '-') for s in symbols]
@@ -46,8 +61,7 @@ def get_nasdaq100_symbols():
     """Get NASDAQ-100 symbols from Wikipedia with fallback"""
     try:
         url = 'https://en.wikipedia.org/wiki/NASDAQ-100'
-        headers = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'}
-        tables = pd.read_html(url, header=0, storage_options={'User-Agent': headers['User-Agent']})
+        tables = fetch_parsed(url, read_html_tables)
         df = tables[4]
         symbols = df['Ticker'].tolist()
         print(f"✅ Loaded {len(symbols)} NASDAQ-100 symbols")
@@ -59,14 +73,115 @@ def get_nasdaq100_symbols():
                 'INTU', 'AMAT', 'HON', 'ISRG', 'CMCSA', 'BKNG', 'VRTX', 'PDD', 'ADP', 'SBUX',
                 'GILD', 'ADI', 'MU', 'REGN', 'LRCX', 'PANW', 'PYPL', 'KLAC', 'MDLZ', 'SNPS']
 
+POPULAR_SYMBOLS = ['PLTR', 'COIN', 'SNOW', 'ABNB', 'UBER', 'LYFT', 'RIVN', 'LCID',
+                   'SOFI', 'HOOD', 'RBLX', 'U', 'PINS', 'SNAP', 'DOCU', 'ZM']
+
+# Optional universe config; without it the S&P 500 + NASDAQ-100 + popular list is used
+UNIVERSE_CONFIG = 'universe.json'
+DEFAULT_UNIVERSE = {
+    'indexes': ['sp500', 'nasdaq100'],   # built-in index loaders
+    'files': [],                         # membership files (CSV with Symbol/Ticker column, or one per line)
+    'exchanges': [],                     # listed stocks: 'nasdaq', 'nyse', 'nyse_american', 'nyse_arca', 'cboe'
+    'symbols': POPULAR_SYMBOLS,          # user list
+    'exclude': [],
+}
+UNIVERSE_TTL_HOURS = 6
+
+INDEX_LOADERS = {
+    'sp500': get_sp500_symbols,
+    'nasdaq100': get_nasdaq100_symbols,
+}
+
+NASDAQ_LISTED_URL = 'https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt'
+OTHER_LISTED_URL = 'https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt'
+# otherlisted.txt exchange codes
+EXCHANGE_CODES = {'nyse': 'N', 'nyse_american': 'A', 'nyse_arca': 'P', 'cboe': 'Z'}
+
+def normalize_symbol(symbol):
+    """Yahoo-style ticker (BRK.B -> BRK-B), or None for non-stock listings"""
+    symbol = str(symbol).strip().upper().replace('.', '-')
+    if not symbol or not all(c.isalnum() or c == '-' for c in symbol):
+        return None
+    return symbol
+
+def load_symbol_file(path):
+    """Symbols from an index membership file (CSV with a Symbol/Ticker column, or one per line)"""
+    try:
+        if path.lower().endswith('.csv'):
+            df = pd.read_csv(path)
+            column = next(c for c in df.columns if c.strip().lower() in ('symbol', 'ticker'))
+            return df[column].dropna().tolist()
+        with open(path, 'r') as f:
+            return [line.split('#')[0].strip() for line in f if line.split('#')[0].strip()]
+    except Exception as e:
+        print(f"⚠️ Could not read symbol file {path}: {e}")
+        return []
+
+def get_exchange_symbols(exchanges, include_etfs=False):
+    """Listed common stocks from the NASDAQ Trader symbol directory"""
+    symbols = []
+    try:
+        if 'nasdaq' in exchanges:
+            df = fetch_parsed(NASDAQ_LISTED_URL, read_pipe_table).dropna(subset=['Symbol'])
+            df = df[df['Test Issue'] == 'N']
+            if not include_etfs:
+                df = df[df['ETF'] == 'N']
+            symbols.extend(df['Symbol'].tolist())
+
+        codes = [EXCHANGE_CODES[e] for e in exchanges if e in EXCHANGE_CODES]
+        if codes:
+            df = fetch_parsed(OTHER_LISTED_URL, read_pipe_table).dropna(subset=['ACT Symbol'])
+            df = df[(df['Test Issue'] == 'N') & df['Exchange'].isin(codes)]
+            if not include_etfs:
+                df = df[df['ETF'] == 'N']
+            symbols.extend(df['ACT Symbol'].tolist())
+
+        print(f"✅ Loaded {len(symbols)} exchange-listed symbols")
+    except Exception as e:
+        print(f"⚠️ Could not load exchange listings: {e}")
+    return symbols
+
+def load_universe_config():
+    """Universe config merged over the defaults"""
+    config = dict(DEFAULT_UNIVERSE)
+    try:
+        with open(UNIVERSE_CONFIG, 'r') as f:
+            config.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"⚠️ Ignoring invalid {UNIVERSE_CONFIG}: {e}")
+    return config
+
+def iter_universe(config):
+    """Stream raw symbols from every configured source"""
+    for name in config.get('indexes', []):
+        loader = INDEX_LOADERS.get(name)
+        if loader:
+            yield from loader()
+    for path in config.get('files', []):
+        yield from load_symbol_file(path)
+    if config.get('exchanges'):
+        yield from get_exchange_symbols(config['exchanges'], config.get('include_etfs', False))
+    yield from config.get('symbols', [])
+
+_universe_cache = {}
+
 def get_all_symbols():
-    """Get all tracked symbols"""
-    sp500 = get_sp500_symbols()
-    nasdaq = get_nasdaq100_symbols()
-    popular = ['PLTR', 'COIN', 'SNOW', 'ABNB', 'UBER', 'LYFT', 'RIVN', 'LCID', 
-               'SOFI', 'HOOD', 'RBLX', 'U', 'PINS', 'SNAP', 'DOCU', 'ZM']
-    all_symbols = list(set(sp500 + nasdaq + popular))
-    return sorted(all_symbols)
+    """Get all tracked symbols for the configured universe (cached for a few hours)"""
+    cached = _universe_cache.get('symbols')
+    if cached and datetime.now() - _universe_cache['time'] < timedelta(hours=UNIVERSE_TTL_HOURS):
+        return cached
+
+    config = load_universe_config()
+    exclude = {normalize_symbol(s) for s in config.get('exclude', [])}
+    all_symbols = {normalize_symbol(s) for s in iter_universe(config)}
+    all_symbols.discard(None)
+    all_symbols = sorted(all_symbols - exclude)
+
+    _universe_cache['symbols'] = all_symbols
+    _universe_cache['time'] = datetime.now()
+    return all_symbols
 
 def search_stock_symbol(query):
     """Search for stock symbols"""
@@ -132,9 +247,124 @@ def calculate_bollinger_bands(prices, period=20, std_dev=2):
 # CHARTING
 # ============================================================================
 
-def create_candlestick_chart(symbol, hist, timeframe="3mo"):
-    """Create candlestick chart"""
+# Point budgets sized for a full-width chart; a browser can't show more
+# than about one line vertex or a few candle pixels per screen pixel
+CHART_WIDTH_PX = 1200
+CANDLE_PX = 3
+
+def point_budget(width_px=CHART_WIDTH_PX, px_per_point=1):
+    """Max points worth sending for a chart of the given pixel width"""
+    return max(3, int(width_px // px_per_point))
+
+LINE_POINT_BUDGET = point_budget()
+CANDLE_BUDGET = point_budget(px_per_point=CANDLE_PX)
+
+def downsample_ohlc(hist, max_bars):
+    """Merge consecutive bars into at most max_bars OHLC buckets.
+
+    Each bucket keeps the first open, highest high, lowest low, last close
+    and total volume, indexed by its first bar, so wicks and gaps survive.
+    """
+    if max_bars is None or len(hist) <= max_bars:
+        return hist
+    size = -(-len(hist) // max_bars)
+    buckets = np.arange(len(hist)) // size
+    agg = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+    agg = {col: how for col, how in agg.items() if col in hist.columns}
+    sampled = hist[list(agg)].groupby(buckets).agg(agg)
+    sampled.index = hist.index[::size]
+    return sampled
+
+def lttb_indices(y, threshold, x=None):
+    """Positions kept by Largest-Triangle-Three-Buckets downsampling.
+
+    Always keeps the first and last point; from each bucket in between keeps
+    the point forming the largest triangle with the previous pick and the
+    next bucket's average, which preserves peaks and troughs.
+    """
+    y = np.asarray(y, dtype='float64')
+    n = len(y)
+    if threshold is None or threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype='float64') if x is None else np.asarray(x, dtype='float64')
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    picks = np.empty(threshold, dtype=int)
+    picks[0], picks[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = np.nanmean(y[next_start:next_end]) if not np.isnan(y[next_start:next_end]).all() else y[a]
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        picks[i + 1] = a
+    return picks
+
+
+def register_chart_template():
+    """Register the dark layout shared by every chart as the 'sharkfin' template.
+
+    Built once on first use, so figures only set what differs and plotly
+    is not imported until a chart is drawn.
+    """
+    import plotly.graph_objects as go
+    import plotly.io as pio
+    if 'sharkfin' in pio.templates:
+        return
+    template = go.layout.Template(pio.templates['plotly_dark'])
+    template.layout.update(
+        paper_bgcolor='#1a1a1a',
+        plot_bgcolor='#1a1a1a',
+        font=dict(color='white'),
+        title=dict(font=dict(color='white', size=16)),
+        xaxis=dict(gridcolor='#2a2a2a', showgrid=True),
+        yaxis=dict(gridcolor='#2a2a2a', showgrid=True),
+        legend=dict(bgcolor='#2a2a2a', bordercolor='#00d4ff', borderwidth=1),
+        margin=dict(l=50, r=50, t=60, b=50)
+    )
+    pio.templates['sharkfin'] = template
+
+FIGURE_CACHE_SIZE = 64
+_figures = OrderedDict()
+_figures_lock = threading.Lock()
+
+def cached_figure(key, build):
+    """Figure for key from a shared LRU, calling build() only on a miss.
+
+    Keys carry the inputs' identity (symbol, timeframe, last bar...), so an
+    unchanged chart is reused across reruns and sessions. Callers must not
+    mutate the returned figure.
+    """
+    with _figures_lock:
+        fig = _figures.get(key)
+        if fig is not None:
+            _figures.move_to_end(key)
+            return fig
+
+    register_chart_template()
+    fig = build()
+    if fig is not None:
+        with _figures_lock:
+            _figures[key] = fig
+            while len(_figures) > FIGURE_CACHE_SIZE:
+                _figures.popitem(last=False)
+    return fig
+
+def create_candlestick_chart(symbol, hist, timeframe="3mo", max_bars=CANDLE_BUDGET):
+    """Create candlestick chart, merging bars beyond max_bars (None sends every bar)"""
     try:
+        # The last close is part of the key so a still-forming bar refreshes the chart
+        key = ('candlestick', symbol, timeframe, max_bars, len(hist), hist.index[-1], float(hist['Close'].iloc[-1]))
+    except:
+        return None
+    return cached_figure(key, lambda: _candlestick_figure(symbol, hist, timeframe, max_bars))
+
+def _candlestick_figure(symbol, hist, timeframe, max_bars):
+    try:
+        import plotly.graph_objects as go
+        hist = downsample_ohlc(hist, max_bars)
         fig = go.Figure(data=[go.Candlestick(
             x=hist.index,
             open=hist['Open'],
@@ -148,125 +378,500 @@ def create_candlestick_chart(symbol, hist, timeframe="3mo"):
         )])
         
         fig.update_layout(
-            title=dict(text=f'{symbol} - {timeframe}', font=dict(color='white', size=18)),
+            title=dict(text=f'{symbol} - {timeframe}', font=dict(size=18)),
             yaxis_title='Price ($)',
-            template='plotly_dark',
+            template='sharkfin',
             height=450,
-            xaxis_rangeslider_visible=False,
-            paper_bgcolor='#1a1a1a',
-            plot_bgcolor='#1a1a1a',
-            font=dict(color='white'),
-            xaxis=dict(gridcolor='#2a2a2a', showgrid=True),
-            yaxis=dict(gridcolor='#2a2a2a', showgrid=True),
-            margin=dict(l=50, r=50, t=60, b=50)
+            xaxis_rangeslider_visible=False
         )
         
         return fig
     except:
         return None
 
-def create_forecast_chart(symbol, historical_prices, forecast_prices, model_name):
+def create_forecast_chart(symbol, historical_prices, forecast_prices, model_name, max_points=LINE_POINT_BUDGET):
     """Create forecast chart with historical + predicted prices"""
     try:
+        recent = np.asarray(historical_prices[-60:], dtype='float64')
+        forecast = np.asarray(forecast_prices, dtype='float64')
+        key = ('forecast', symbol, model_name, max_points, recent.tobytes(), forecast.tobytes())
+    except:
+        return None
+    return cached_figure(key, lambda: _forecast_figure(symbol, recent, forecast, model_name, max_points))
+
+def _forecast_figure(symbol, recent, forecast, model_name, max_points):
+    try:
+        import plotly.graph_objects as go
         fig = go.Figure()
         
         # Historical prices
-        hist_x = list(range(len(historical_prices[-60:])))
+        keep = lttb_indices(recent, max_points)
         fig.add_trace(go.Scatter(
-            x=hist_x,
-            y=historical_prices[-60:],
+            x=keep,
+            y=recent[keep],
             mode='lines',
             name='Historical',
             line=dict(color='#00d4ff', width=2.5)
         ))
         
         # Forecast prices
-        forecast_x = list(range(len(historical_prices[-60:]), len(historical_prices[-60:]) + len(forecast_prices)))
+        keep = lttb_indices(forecast, max_points)
         fig.add_trace(go.Scatter(
-            x=forecast_x,
-            y=forecast_prices,
+            x=keep + len(recent),
+            y=forecast[keep],
             mode='lines',
             name='Forecast',
             line=dict(color='#ff8800', width=2.5, dash='dash')
         ))
         
         fig.update_layout(
-            title=dict(text=f'{symbol} - {model_name}', font=dict(color='white', size=16)),
+            title=dict(text=f'{symbol} - {model_name}'),
             yaxis_title='Price ($)',
             xaxis_title='Days',
-            template='plotly_dark',
-            height=400,
-            paper_bgcolor='#1a1a1a',
-            plot_bgcolor='#1a1a1a',
-            font=dict(color='white'),
-            xaxis=dict(gridcolor='#2a2a2a', showgrid=True),
-            yaxis=dict(gridcolor='#2a2a2a', showgrid=True),
-            legend=dict(bgcolor='#2a2a2a', bordercolor='#00d4ff', borderwidth=1),
-            margin=dict(l=50, r=50, t=60, b=50)
+            template='sharkfin',
+            height=400
+        )
+        
+        return fig
+    except:
+        return None
+
+def create_performance_chart(curve, benchmark="SPY", max_points=LINE_POINT_BUDGET):
+    """Portfolio growth (time-weighted, rebased to 100) vs benchmark, with drawdown"""
+    try:
+        last = curve.iloc[-1]
+        key = ('performance', benchmark, max_points, len(curve), curve.index[0], curve.index[-1],
+               float(last['index']), float(last['benchmark']))
+    except:
+        return None
+    return cached_figure(key, lambda: _performance_figure(curve, benchmark, max_points))
+
+def _performance_figure(curve, benchmark, max_points):
+    try:
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.72, 0.28],
+                            vertical_spacing=0.04)
+        
+        def sampled(column):
+            keep = lttb_indices(curve[column].to_numpy(dtype='float64'), max_points)
+            return curve.index[keep], curve[column].to_numpy()[keep]
+        
+        x, y = sampled('index')
+        fig.add_trace(go.Scatter(
+            x=x,
+            y=y,
+            mode='lines',
+            name='Portfolio',
+            line=dict(color='#00ff88', width=2.5)
+        ), row=1, col=1)
+        
+        x, y = sampled('benchmark')
+        fig.add_trace(go.Scatter(
+            x=x,
+            y=y,
+            mode='lines',
+            name=benchmark,
+            line=dict(color='#00d4ff', width=1.5, dash='dot')
+        ), row=1, col=1)
+        
+        x, y = sampled('drawdown')
+        fig.add_trace(go.Scatter(
+            x=x,
+            y=y * 100,
+            mode='lines',
+            name='Drawdown',
+            fill='tozeroy',
+            line=dict(color='#ff4444', width=1)
+        ), row=2, col=1)
+        
+        fig.update_layout(
+            title=dict(text='Portfolio Performance'),
+            template='sharkfin',
+            height=450
         )
+        fig.update_yaxes(title_text='Growth of 100', row=1, col=1)
+        fig.update_yaxes(title_text='DD %', row=2, col=1)
         
         return fig
     except:
         return None
 
+def create_correlation_heatmap(corr):
+    """Correlation heatmap for holdings"""
+    try:
+        key = ('correlation', tuple(corr.columns), corr.to_numpy().tobytes())
+    except:
+        return None
+    return cached_figure(key, lambda: _correlation_figure(corr))
+
+def _correlation_figure(corr):
+    try:
+        import plotly.graph_objects as go
+        fig = go.Figure(data=go.Heatmap(
+            z=corr.values,
+            x=list(corr.columns),
+            y=list(corr.index),
+            zmin=-1,
+            zmax=1,
+            colorscale=[[0, '#ff4444'], [0.5, '#1a1a1a'], [1, '#00ff88']],
+            hovertemplate='%{y} / %{x}: %{z:.2f}<extra></extra>'
+        ))
+        
+        fig.update_layout(
+            title=dict(text='Correlation (1Y daily returns)'),
+            template='sharkfin',
+            height=max(350, 22 * len(corr))
+        )
+        
+        return fig
+    except:
+        return None
+
+SPARKLINE_WIDTH = 120
+SPARKLINE_HEIGHT = 28
+
+def sparkline_svgs(closes, width=SPARKLINE_WIDTH, height=SPARKLINE_HEIGHT):
+    """Tiny SVG trend line per column of a close matrix, as img-ready data URIs.
+
+    Scaling is done for all columns at once; green if the last close is at or
+    above the first, red otherwise.
+    """
+    closes = closes.ffill().dropna(axis=1, how='all')
+    if len(closes) < 2 or closes.empty:
+        return {}
+    values = closes.to_numpy(dtype='float64')
+    first = closes.bfill().iloc[0].to_numpy(dtype='float64')
+    lo, hi = np.nanmin(values, axis=0), np.nanmax(values, axis=0)
+    # Flat series sit mid-height
+    scaled = np.where(hi > lo, (values - lo) / np.where(hi > lo, hi - lo, 1.0), 0.5)
+    xs = np.linspace(1, width - 1, len(values))
+    ys = (height - 1) - scaled * (height - 2)
+
+    svgs = {}
+    for col, symbol in enumerate(closes.columns):
+        valid = ~np.isnan(ys[:, col])
+        if valid.sum() < 2:
+            continue
+        points = ' '.join(f"{x:.1f},{y:.1f}" for x, y in zip(xs[valid], ys[valid, col]))
+        color = '#00ff88' if values[-1, col] >= first[col] else '#ff4444'
+        svg = (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}">'
+               f'<polyline points="{points}" fill="none" stroke="{color}" stroke-width="1.5"/></svg>')
+        svgs[symbol] = 'data:image/svg+xml;base64,' + base64.b64encode(svg.encode()).decode()
+    return svgs
+
 # ============================================================================
 # NEWS FUNCTIONS
 # ============================================================================
 
+NEWS_PREFETCH_WORKERS = 8
+NEWS_CACHE_TTL_SECONDS = 1800
+# Past the TTL, cached articles are still served while a refresh runs in the
+# background; past this age a request waits for fresh ones instead
+NEWS_CACHE_MAX_STALE_SECONDS = 6 * 3600
+NEWS_CACHE_MAX_ENTRIES = 200
+# Keyword searches go to the network only when the local index has fewer hits
+NEWS_INDEX_MIN_HITS = 5
+
+class NewsCache:
+    """Process-wide LRU cache of news results, shared by every session.
+
+    Fresh entries are returned as-is. Stale ones are returned immediately
+    while a single background refresh per key replaces them
+    (stale-while-revalidate). Empty results are never cached.
+    """
+
+    def __init__(self, max_entries=NEWS_CACHE_MAX_ENTRIES, ttl_seconds=NEWS_CACHE_TTL_SECONDS,
+                 max_stale_seconds=NEWS_CACHE_MAX_STALE_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=4, thread_name_prefix='news-refresh')
+
+    def _store(self, key, articles):
+        if not articles:
+            return
+        with self._lock:
+            self._entries[key] = (time.time(), articles)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _refresh(self, key, fetch):
+        try:
+            self._store(key, fetch())
+        except Exception as e:
+            print(f"⚠️ News refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get(self, key, fetch):
+        """Cached articles for key, calling fetch() when missing or too old"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                fetched_at, articles = entry
+                age = time.time() - fetched_at
+                if age < self.ttl_seconds:
+                    return articles
+                if age < self.max_stale_seconds:
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self._refresher.submit(self._refresh, key, fetch)
+                    return articles
+
+        articles = fetch()
+        self._store(key, articles)
+        return articles
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+news_cache = NewsCache()
+
+# ----------------------------------------------------------------------------
+# Keyword matching: a keyword set compiled into one regex, one scan per text
+# ----------------------------------------------------------------------------
+
+class KeywordMatcher:
+    """Case-sensitive substring matcher for a set of lowercase keywords.
+
+    The zero-width lookahead tries every start position, longest keyword
+    first; shorter keywords inside a match are credited from a precomputed
+    containment map, so matches() finds exactly the keywords present.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = tuple(dict.fromkeys(k.lower() for k in keywords if k))
+        ordered = sorted(self.keywords, key=len, reverse=True)
+        self._pattern = re.compile('(?=(' + '|'.join(map(re.escape, ordered)) + '))') if ordered else None
+        self._implied = {k: frozenset(o for o in self.keywords if o in k) for k in self.keywords}
+
+    def search(self, text):
+        """True if any keyword occurs in text"""
+        return self._pattern is not None and self._pattern.search(text) is not None
+
+    def matches(self, text):
+        """Set of keywords occurring in text"""
+        found = set()
+        if self._pattern is not None:
+            for match in self._pattern.finditer(text):
+                found |= self._implied[match.group(1)]
+        return found
+
+@lru_cache(maxsize=256)
+def compile_keywords(keywords):
+    """Shared KeywordMatcher for a tuple of keywords"""
+    return KeywordMatcher(keywords)
+
+# ----------------------------------------------------------------------------
+# Feed layer: each distinct RSS URL is downloaded and parsed once per window
+# ----------------------------------------------------------------------------
+
+FEED_REFRESH_SECONDS = 300
+# Search and per-symbol URLs are open-ended; least recently used feeds are dropped past this
+FEED_MAX_URLS = 200
+NEWS_MAX_AGE_DAYS = 7
+
+YAHOO_INDEX_URL = 'https://finance.yahoo.com/news/rssindex'
+YAHOO_HEADLINE_URL = 'https://finance.yahoo.com/rss/headline?s={}'
+
+# Categories served from the shared Yahoo index, narrowed by keywords
+NEWS_CATEGORY_KEYWORDS = {
+    'healthcare': ('healthcare', 'pharma', 'biotech', 'medical', 'drug', 'hospital'),
+    'energy': ('energy', 'oil', 'gas', 'renewable', 'solar', 'wind'),
+    'banking': ('bank', 'banking', 'financial', 'fed', 'interest'),
+    'mergers': ('merger', 'acquisition', 'deal', 'takeover', 'buyout'),
+    'food': ('food', 'beverage', 'restaurant', 'consumer'),
+}
+NEWS_CATEGORY_MATCHERS = {name: compile_keywords(kws) for name, kws in NEWS_CATEGORY_KEYWORDS.items()}
+
+_feeds = OrderedDict()
+_feeds_lock = threading.Lock()
+# url -> [lock, callers holding or waiting on it]; an entry lives while the
+# URL is cached or has callers, so no caller ever sees a second lock for it
+_feed_locks = {}
+
+def _cached_feed(url):
+    with _feeds_lock:
+        cached = _feeds.get(url)
+        if cached:
+            _feeds.move_to_end(url)
+        return cached
+
+def _store_feed(url, entries):
+    with _feeds_lock:
+        _feeds[url] = (time.time(), entries)
+        _feeds.move_to_end(url)
+        while len(_feeds) > FEED_MAX_URLS:
+            evicted, _ = _feeds.popitem(last=False)
+            if _feed_locks.get(evicted, (None, 1))[1] == 0:
+                del _feed_locks[evicted]
+
+def _acquire_feed_lock(url):
+    """The URL's lock entry, counting the caller in until _release_feed_lock"""
+    with _feeds_lock:
+        entry = _feed_locks.get(url)
+        if entry is None:
+            entry = _feed_locks[url] = [threading.Lock(), 0]
+        entry[1] += 1
+        return entry
+
+def _release_feed_lock(url, entry):
+    """Count the caller out; forget the lock once it has no callers and no cached feed"""
+    with _feeds_lock:
+        entry[1] -= 1
+        if entry[1] == 0 and url not in _feeds:
+            del _feed_locks[url]
+
+def _normalize_entry(entry, source):
+    """(article, lowercase title, lowercase summary, published datetime) for one feed entry"""
+    try:
+        published = datetime(*entry.published_parsed[:6])
+    except Exception:
+        published = None
+    article = {
+        'title': entry.get('title', 'No title'),
+        'description': entry.get('summary', ''),
+        'source': {'name': source},
+        'publishedAt': entry.get('published', datetime.now().isoformat())
+    }
+    return article, entry.get('title', '').lower(), entry.get('summary', '').lower(), published
+
+def get_feed(url, source):
+    """Normalized entries for an RSS feed, shared across queries and sessions.
+
+    Concurrent callers for the same URL wait on one download; results are
+    reused for FEED_REFRESH_SECONDS. At most FEED_MAX_URLS feeds are kept.
+    """
+    entry = _acquire_feed_lock(url)
+    try:
+        with entry[0]:
+            return _load_feed(url, source)
+    finally:
+        _release_feed_lock(url, entry)
+
+def _load_feed(url, source):
+    """Cached or freshly fetched entries for url; the caller holds the URL's lock"""
+    cached = _cached_feed(url)
+    if cached and time.time() - cached[0] < FEED_REFRESH_SECONDS:
+        return cached[1]
+
+    import feedparser
+    try:
+        # Revalidated with ETag/Last-Modified; unchanged feeds skip the re-parse
+        entries = fetch_parsed(url, lambda body: [_normalize_entry(entry, source)
+                                                  for entry in feedparser.parse(body).entries])
+    except Exception as e:
+        print(f"⚠️ Feed fetch failed for {url}: {e}")
+        entries = []
+    if entries:
+        _store_feed(url, entries)
+        # Everything any feed returns becomes searchable locally
+        ensure_entity_tagger()
+        article_index.add([entry[0] for entry in entries])
+    elif cached:
+        # Keep serving the last good copy if the feed hiccups
+        entries = cached[1]
+    return entries
+
+_tagger_state = {'key': None, 'building': False}
+_tagger_lock = threading.Lock()
+
+def _file_mtime(path):
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+def _latest_snapshot_path():
+    snapshots = list_snapshots()
+    return snapshots[-1][1] if snapshots else None
+
+def _tagger_key():
+    """Changes only when the universe, the fundamentals table or the latest ranking snapshot does"""
+    return (_universe_cache.get('time'), _file_mtime(FUNDAMENTALS_FILE), _latest_snapshot_path())
+
+def company_names():
+    """symbol -> company name from the latest scan snapshot and the cached fundamentals"""
+    names = {}
+    snapshot_path = _latest_snapshot_path()
+    if snapshot_path:
+        names.update(pd.read_pickle(snapshot_path)['name'].dropna().to_dict())
+    if _file_mtime(FUNDAMENTALS_FILE) is not None:
+        names.update(pd.read_pickle(FUNDAMENTALS_FILE)['name'].dropna().to_dict())
+    return names
+
+def _build_entity_tagger():
+    try:
+        symbols = get_all_symbols()
+        key = _tagger_key()
+        try:
+            names = company_names()
+        except Exception as e:
+            print(f"⚠️ Company names unavailable for news tagging: {e}")
+            names = {}
+        article_index.set_tagger(EntityTagger(symbols, names))
+        with _tagger_lock:
+            _tagger_state['key'] = key
+    except Exception as e:
+        print(f"⚠️ News tagger build failed: {e}")
+    finally:
+        with _tagger_lock:
+            _tagger_state['building'] = False
+
+def ensure_entity_tagger():
+    """Rebuild the article index's ticker tagger in the background when its inputs change.
+
+    Never blocks: articles indexed before the tagger is ready are retagged
+    when it is installed.
+    """
+    key = _tagger_key()
+    with _tagger_lock:
+        if _tagger_state['key'] == key or _tagger_state['building']:
+            return
+        _tagger_state['building'] = True
+    threading.Thread(target=_build_entity_tagger, name='news-tagger', daemon=True).start()
+
+def yahoo_feed_for(query):
+    """(feed URL, category KeywordMatcher or None) for a news query"""
+    query_lower = query.lower()
+    if 'technology stocks' in query_lower:
+        return YAHOO_HEADLINE_URL.format('^IXIC'), None
+    if 'healthcare' in query_lower:
+        return YAHOO_INDEX_URL, NEWS_CATEGORY_MATCHERS['healthcare']
+    if 'energy' in query_lower:
+        return YAHOO_INDEX_URL, NEWS_CATEGORY_MATCHERS['energy']
+    if 'banking' in query_lower or 'finance stocks' in query_lower:
+        return YAHOO_INDEX_URL, NEWS_CATEGORY_MATCHERS['banking']
+    if 'mergers' in query_lower:
+        return YAHOO_INDEX_URL, NEWS_CATEGORY_MATCHERS['mergers']
+    if 'food' in query_lower:
+        return YAHOO_INDEX_URL, NEWS_CATEGORY_MATCHERS['food']
+    if 'financial markets' in query_lower or query_lower == 'all':
+        return YAHOO_INDEX_URL, None
+    symbol = query.upper().replace(' STOCK', '').strip().split()[0]
+    return YAHOO_HEADLINE_URL.format(symbol), None
+
 def get_news_from_yahoo(query, count):
     """Fetch news from Yahoo Finance RSS"""
     try:
-        query_lower = query.lower()
-        filter_keywords = None
-        
-        if 'technology stocks' in query_lower:
-            url = 'https://finance.yahoo.com/rss/headline?s=^IXIC'
-        elif 'healthcare' in query_lower:
-            url = 'https://finance.yahoo.com/news/rssindex'
-            filter_keywords = ['healthcare', 'pharma', 'biotech', 'medical', 'drug', 'hospital']
-        elif 'energy' in query_lower:
-            url = 'https://finance.yahoo.com/news/rssindex'
-            filter_keywords = ['energy', 'oil', 'gas', 'renewable', 'solar', 'wind']
-        elif 'banking' in query_lower or 'finance stocks' in query_lower:
-            url = 'https://finance.yahoo.com/news/rssindex'
-            filter_keywords = ['bank', 'banking', 'financial', 'fed', 'interest']
-        elif 'mergers' in query_lower:
-            url = 'https://finance.yahoo.com/news/rssindex'
-            filter_keywords = ['merger', 'acquisition', 'deal', 'takeover', 'buyout']
-        elif 'food' in query_lower:
-            url = 'https://finance.yahoo.com/news/rssindex'
-            filter_keywords = ['food', 'beverage', 'restaurant', 'consumer']
-        elif 'financial markets' in query_lower or query_lower == 'all':
-            url = 'https://finance.yahoo.com/news/rssindex'
-        else:
-            symbol = query.upper().replace(' STOCK', '').strip().split()[0]
-            url = f'https://finance.yahoo.com/rss/headline?s={symbol}'
-        
-        feed = feedparser.parse(url)
-        cutoff_date = datetime.now() - timedelta(days=7)
+        url, matcher = yahoo_feed_for(query)
+        cutoff_date = datetime.now() - timedelta(days=NEWS_MAX_AGE_DAYS)
         
         articles = []
-        for entry in feed.entries:
-            try:
-                pub_date = datetime(*entry.published_parsed[:6])
-                if pub_date < cutoff_date:
-                    continue
-            except:
-                pass
-            
-            title = entry.get('title', '').lower()
-            summary = entry.get('summary', '').lower()
+        for article, title, summary, published in get_feed(url, 'Yahoo Finance'):
+            if published is not None and published < cutoff_date:
+                continue
             
-            if filter_keywords:
-                if not any(kw in title or kw in summary for kw in filter_keywords):
+            if matcher:
+                if not (matcher.search(title) or matcher.search(summary)):
                     continue
             
-            articles.append({
-                'title': entry.get('title', 'No title'),
-                'description': entry.get('summary', ''),
-                'source': {'name': 'Yahoo Finance'},
-                'publishedAt': entry.get('published', datetime.now().isoformat())
-            })
+            articles.append(dict(article))
             
             if len(articles) >= count * 2:
                 break
@@ -275,47 +880,65 @@ def get_news_from_yahoo(query, count):
     except:
         return []
 
-def calculate_article_relevance(article, query):
-    """ML relevance scoring"""
+# Title words that mark a potentially market-moving story
+IMPORTANT_KEYWORDS = ('earnings', 'billion', 'merger', 'breakthrough', 'deal')
+
+def parse_published(date_str):
+    """Naive datetime from an ISO or RFC 822 feed date, or None"""
+    if not date_str:
+        return None
     try:
-        article_text = f"{article['title']} {article.get('description', '')}"
-        vectorizer = TfidfVectorizer(stop_words='english', max_features=100)
-        
-        try:
-            vectors = vectorizer.fit_transform([query.lower(), article_text.lower()])
-            similarity = cosine_similarity(vectors[0:1], vectors[1:2])[0][0]
-        except:
-            similarity = 0.0
-        
-        score = similarity
-        
-        # Boost for query words in title
-        for word in query.lower().split():
-            if len(word) > 3 and word in article['title'].lower():
-                score += 0.2
-        
-        # Boost for important keywords
-        important = ['earnings', 'billion', 'merger', 'breakthrough', 'deal']
-        for kw in important:
-            if kw in article['title'].lower():
-                score += 0.1
-        
-        # Recency boost
-        try:
-            pub_str = article.get('publishedAt', '')
-            if pub_str:
-                pub_date = datetime.fromisoformat(pub_str.replace('Z', '+00:00'))
-                days_old = (datetime.now() - pub_date.replace(tzinfo=None)).days
-                if days_old <= 1:
-                    score += 0.3
-                elif days_old <= 3:
-                    score += 0.2
-        except:
-            pass
-        
-        return score
-    except:
-        return 0.5
+        return datetime.fromisoformat(date_str.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        pass
+    try:
+        parsed = parsedate_to_datetime(date_str)
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone().replace(tzinfo=None)
+        return parsed
+    except (TypeError, ValueError, IndexError):
+        return None
+
+def score_articles_relevance(articles, query):
+    """ML relevance score for a batch of articles against one query.
+
+    Fits a single TF-IDF vectorizer over the query plus every article and
+    gets all cosine similarities from one sparse product (rows are already
+    L2-normalized). Title boosts come from one compiled keyword scan per
+    title and the recency boost is an array operation. Returns a float array aligned with `articles`.
+    """
+    if not articles:
+        return np.zeros(0)
+
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    query_lower = query.lower()
+    texts = [f"{a['title']} {a.get('description', '')}".lower() for a in articles]
+    try:
+        vectors = TfidfVectorizer(stop_words='english').fit_transform([query_lower] + texts)
+        scores = (vectors[1:] @ vectors[0].T).toarray().ravel()
+    except ValueError:
+        # Nothing but stop words in the corpus
+        scores = np.zeros(len(articles))
+
+    # Boosts for query words and important keywords in the title, from one
+    # scan per title; a word in both lists earns both boosts
+    weights = Counter()
+    for word in query_lower.split():
+        if len(word) > 3:
+            weights[word] += 0.2
+    for kw in IMPORTANT_KEYWORDS:
+        weights[kw] += 0.1
+    matcher = compile_keywords(tuple(weights))
+    scores += np.array([sum(weights[kw] for kw in matcher.matches(a['title'].lower())) for a in articles])
+
+    # Recency boost
+    now = datetime.now()
+    days_old = np.array([(now - d).days if d else np.nan
+                         for d in (parse_published(a.get('publishedAt', '')) for a in articles)])
+    scores += np.select([days_old <= 1, days_old <= 3], [0.3, 0.2], default=0.0)
+
+    return scores
 
 def search_news_google(query, count):
     """Google News RSS backup"""
@@ -323,50 +946,110 @@ def search_news_google(query, count):
         encoded = query.replace(' ', '+')
         url = f'https://news.google.com/rss/search?q={encoded}+stock&hl=en-US&gl=US&ceid=US:en'
         
-        feed = feedparser.parse(url)
-        articles = []
+        articles = [dict(entry[0]) for entry in get_feed(url, 'Google News')[:count * 3]]
         
-        for entry in feed.entries[:count * 3]:
-            article = {
-                'title': entry.get('title', 'No title'),
-                'description': entry.get('summary', ''),
-                'source': {'name': 'Google News'},
-                'publishedAt': entry.get('published', datetime.now().isoformat())
-            }
-            article['relevance_score'] = calculate_article_relevance(article, query)
-            articles.append(article)
+        scores = score_articles_relevance(articles, query)
+        for article, score in zip(articles, scores):
+            article['relevance_score'] = float(score)
         
         articles = sorted(articles, key=lambda x: x['relevance_score'], reverse=True)
         return articles[:count]
     except:
         return []
 
-def get_news_from_api(query, count, cache):
-    """Main news function with caching"""
-    if query in cache:
-        cached_time, cached_data = cache[query]
-        if (datetime.now() - cached_time).seconds < 1800:
-            return cached_data
-    
+def get_news_from_api(query, count):
+    """Main news function, served from the shared news cache"""
+    return news_cache.get((query, count), lambda: fetch_news(query, count))
+
+# ----------------------------------------------------------------------------
+# Near-duplicate detection: MinHash over title shingles with an LSH index
+# ----------------------------------------------------------------------------
+
+DUPLICATE_THRESHOLD = 0.7
+MINHASH_BANDS = 16
+MINHASH_ROWS = 2
+_MINHASH_PRIME = (1 << 31) - 1
+_minhash_rng = np.random.default_rng(7)
+_MINHASH_A = _minhash_rng.integers(1, _MINHASH_PRIME, MINHASH_BANDS * MINHASH_ROWS, dtype=np.uint64)
+_MINHASH_B = _minhash_rng.integers(0, _MINHASH_PRIME, MINHASH_BANDS * MINHASH_ROWS, dtype=np.uint64)
+
+_SOURCE_SUFFIX_RE = re.compile(r'\s+[-|–—]\s+[^-|–—]{1,40}$')
+_NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+
+def normalize_title(title):
+    """Lowercase title without a trailing " - Source" and punctuation"""
+    title = _SOURCE_SUFFIX_RE.sub('', title.strip())
+    return _NON_WORD_RE.sub(' ', title.lower()).strip()
+
+def _minhash(text, shingle_size=4):
+    """MinHash signature of a string's character shingles"""
+    shingles = {text[i:i + shingle_size] for i in range(max(1, len(text) - shingle_size + 1))}
+    hashes = np.fromiter((zlib.crc32(sh.encode('utf-8')) for sh in shingles),
+                         dtype=np.uint64, count=len(shingles))
+    return ((_MINHASH_A[:, None] * hashes[None, :] + _MINHASH_B[:, None]) % _MINHASH_PRIME).min(axis=1)
+
+def dedupe_articles(articles, threshold=DUPLICATE_THRESHOLD):
+    """Collapse near-duplicate stories, keeping the best-scored copy of each.
+
+    Articles are visited best relevance_score first and checked only
+    against kept articles sharing an LSH band, so the pass is linear.
+    Survivors keep their original order.
+    """
+    order = sorted(range(len(articles)), key=lambda i: -articles[i].get('relevance_score', 0))
+    buckets = {}
+    kept = {}
+
+    for i in order:
+        signature = _minhash(normalize_title(articles[i]['title']))
+        bands = [(b, signature[b * MINHASH_ROWS:(b + 1) * MINHASH_ROWS].tobytes())
+                 for b in range(MINHASH_BANDS)]
+
+        candidates = {j for band in bands for j in buckets.get(band, ())}
+        if any(np.mean(kept[j] == signature) >= threshold for j in candidates):
+            continue
+
+        kept[i] = signature
+        for band in bands:
+            buckets.setdefault(band, []).append(i)
+
+    return [articles[i] for i in sorted(kept)]
+
+def fetch_news(query, count):
+    """Yahoo news for a query, topped up from Google News when sparse"""
     articles = get_news_from_yahoo(query, count)
     
     if len(articles) < 5 and query.lower() not in ['all', 'financial markets economy stocks']:
-        google_articles = search_news_google(query, count)
-        articles.extend(google_articles)
-        
-        seen = set()
-        unique = []
-        for a in articles:
-            title = a['title'].lower()
-            if title not in seen:
-                seen.add(title)
-                unique.append(a)
-        articles = unique[:count]
-    
-    if articles:
-        cache[query] = (datetime.now(), articles)
+        articles.extend(search_news_google(query, count))
     
-    return articles
+    return dedupe_articles(articles)[:count]
+
+def search_news(query, count):
+    """Keyword news search, answered from the local article index when it has enough hits.
+
+    Only articles matching every query term count toward NEWS_INDEX_MIN_HITS,
+    so generic words ("earnings", "market") can't stand in for a specific search.
+    """
+    hits = article_index.search(query, count, require_all=True)
+    if len(hits) >= NEWS_INDEX_MIN_HITS:
+        return hits
+    return dedupe_articles(hits + get_news_from_api(query, count))[:count]
+
+def related_news(symbol, count):
+    """Indexed articles that mention a symbol or its company; never fetches"""
+    ensure_entity_tagger()
+    return article_index.articles_for(symbol, count)
+
+def prefetch_news(queries, count, max_workers=NEWS_PREFETCH_WORKERS):
+    """Fetch several news queries concurrently; returns {query: articles}.
+
+    Cold load costs the slowest feed instead of the sum of all of them.
+    """
+    queries = list(dict.fromkeys(queries))
+    if not queries:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(queries))) as executor:
+        futures = {query: executor.submit(get_news_from_api, query, count) for query in queries}
+    return {query: future.result() for query, future in futures.items()}
 
 def format_time_ago(date_str):
     """Format date as time ago"""